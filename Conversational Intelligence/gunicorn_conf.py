@@ -0,0 +1,20 @@
+# gunicorn_conf.py
+# Production WSGI server configuration for the Intelligence Webhook Server
+# Usage: gunicorn -c gunicorn_conf.py server:app
+
+import os
+
+PORT = int(os.getenv('PORT', 4000))
+
+bind = f"0.0.0.0:{PORT}"
+
+# A single worker process: the webhook history, its version counter, the webhook queue and its
+# worker threads all live in process memory, so extra processes would each see a different history.
+# Concurrency for the I/O-bound webhook handling comes from gthread threads instead.
+workers = int(os.getenv('WEB_CONCURRENCY', 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+
+timeout = 30
+accesslog = '-' if os.getenv("DEBUG_MODE", "false").lower() == "true" else None
+errorlog = '-'
@@ -1,17 +1,17 @@
-import json
+import importlib.util
+import logging
 import os
+import queue
+import re
 import threading
-import time
-from flask import Flask, request, jsonify
+import uuid
+from collections import deque
+import orjson
+from flask import Flask, Response, request
 from dotenv import load_dotenv
 
-# Try to import pyngrok, but handle gracefully if not available (for production)
-try:
-    from pyngrok import ngrok
-    NGROK_AVAILABLE = True
-except ImportError:
-    NGROK_AVAILABLE = False
-    print("Warning: pyngrok not available. Ngrok functionality disabled.")
+# pyngrok is only imported when a tunnel is set up (local development); just check it is installed
+NGROK_AVAILABLE = importlib.util.find_spec("pyngrok") is not None
 
 # Load environment variables from .env file
 load_dotenv()
@@ -19,106 +19,175 @@ load_dotenv()
 # Create Flask app
 app = Flask(__name__)
 
-# Store for received data
-received_data = []
+# Verbose webhook payload logging is only enabled in debug mode
+DEBUG_MODE = os.getenv("DEBUG_MODE", "false").lower() == "true"
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG if DEBUG_MODE else logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+def ojson(obj, status=200, headers=None):
+    """Serialize obj with orjson into a Flask JSON response"""
+    return Response(orjson.dumps(obj), status=status, mimetype='application/json', headers=headers)
+
+# Store for received data (bounded ring buffer so memory and /data payloads stay capped)
+received_data = deque(maxlen=int(os.getenv('WEBHOOK_HISTORY_MAX', 1000)))
+received_data_lock = threading.Lock()
+
+# Bumped on every change to received_data; used as the ETag for /data and /status.
+# The instance id keeps ETags unique across restarts.
+data_version = 0
+INSTANCE_ID = uuid.uuid4().hex[:8]
+
+def current_etag():
+    return f'W/"{INSTANCE_ID}-{data_version}"'
+
+def not_modified(etag):
+    """Return a 304 response if the client already has this version, else None"""
+    if request.headers.get('If-None-Match') == etag:
+        return Response(status=304, headers={'ETag': etag})
+    return None
+
+# Webhooks are queued and processed by a pool of worker threads so requests return immediately
+WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', 4))
+webhook_queue = queue.Queue(maxsize=int(os.getenv('WEBHOOK_QUEUE_MAX', 10000)))
 
 # Environment-aware port configuration
 deployment_env = os.getenv('DEPLOYMENT_ENVIRONMENT', 'local')
 PORT = int(os.getenv('PORT', 4000))
 
+# Webhook fields with dedicated handling in log_webhook_details
+KNOWN_FIELDS = frozenset({'TranscriptSid', 'Status', 'OperatorResults', 'Channel', 'Text', 'Partial', 'Timestamp'})
+TRANSCRIPT_KEY_RX = re.compile(r'transcript', re.I)
+
+def log_webhook_details(data):
+    """Log the complete webhook payload with a detailed breakdown of its structure"""
+    data = data or {}
+    logger.debug("\n" + "="*80)
+    logger.debug("WEBHOOK RECEIVED - COMPLETE PAYLOAD DETAILS")
+    logger.debug("="*80)
+    
+    # Print raw JSON with pretty formatting
+    logger.debug("RAW PAYLOAD:")
+    logger.debug("-" * 40)
+    logger.debug(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS).decode())
+    logger.debug("-" * 40)
+    
+    # Print detailed breakdown of payload structure
+    logger.debug("\nPAYLOAD STRUCTURE ANALYSIS:")
+    logger.debug("-" * 40)
+    for key, value in data.items():
+        logger.debug(f"KEY: {key}")
+        logger.debug(f"  TYPE: {type(value).__name__}")
+        if isinstance(value, dict):
+            logger.debug(f"  NESTED KEYS: {list(value.keys())}")
+        elif isinstance(value, list):
+            logger.debug(f"  LIST LENGTH: {len(value)}")
+            if value and isinstance(value[0], dict):
+                logger.debug(f"  FIRST ITEM KEYS: {list(value[0].keys())}")
+        else:
+            logger.debug(f"  VALUE: {value}")
+        logger.debug("")
+    
+    # Handle different types of webhooks with more detailed output
+    if 'TranscriptSid' in data:
+        logger.debug(f"TRANSCRIPTION UPDATE DETAILS:")
+        logger.debug(f"  Transcript SID: {data.get('TranscriptSid')}")
+        logger.debug(f"  Status: {data.get('Status')}")
+        logger.debug(f"  All transcription fields: {[k for k in data if TRANSCRIPT_KEY_RX.search(k)]}")
+        
+        if data.get('Status') == 'completed':
+            logger.debug("  → Transcription completed!")
+        elif data.get('Status') == 'in-progress':
+            logger.debug("  → Transcription in progress...")
+            
+    if 'OperatorResults' in data:
+        logger.debug(f"OPERATOR RESULTS DETAILS:")
+        for i, result in enumerate(data['OperatorResults']):
+            logger.debug(f"  Result #{i+1}:")
+            logger.debug(f"    Operator: {result.get('operator_type')}")
+            logger.debug(f"    Result: {result.get('result')}")
+            logger.debug(f"    All keys: {list(result.keys())}")
+    
+    # Handle real-time transcription streaming with more details
+    if 'Channel' in data and 'Text' in data:
+        logger.debug(f"REAL-TIME TRANSCRIPTION DETAILS:")
+        logger.debug(f"  Channel: {data['Channel']}")
+        logger.debug(f"  Text: '{data['Text']}'")
+        logger.debug(f"  Partial: {data.get('Partial', 'Not specified')}")
+        logger.debug(f"  Timestamp: {data.get('Timestamp', 'Not provided')}")
+        logger.debug(f"  All transcription keys: {[k for k in data.keys()]}")
+        
+        if data.get('Partial'):
+            logger.debug("  → (Partial transcription)")
+        else:
+            logger.debug("  → (Final transcription)")
+    
+    # Print any additional fields not covered above
+    additional_fields = [k for k in data if k not in KNOWN_FIELDS]
+    if additional_fields:
+        logger.debug(f"ADDITIONAL FIELDS:")
+        for field in sorted(additional_fields):
+            logger.debug(f"  {field}: {data[field]}")
+    
+    logger.debug("="*80)
+
+def process_webhook(data):
+    """Store a webhook payload and log its details"""
+    global data_version
+    with received_data_lock:
+        received_data.append(data)
+        data_version += 1
+    
+    logger.info(f"Webhook received ({len(data) if data else 0} fields)")
+
+    # Detailed payload breakdown is only built when debug logging is enabled
+    if logger.isEnabledFor(logging.DEBUG):
+        log_webhook_details(data)
+
+def webhook_worker():
+    """Drain the webhook queue until the process exits"""
+    while True:
+        data = webhook_queue.get()
+        try:
+            process_webhook(data)
+        except Exception as e:
+            logger.error(f"Error processing webhook: {str(e)}")
+        finally:
+            webhook_queue.task_done()
+
+def start_webhook_workers():
+    """Start the daemon threads that process queued webhooks"""
+    for i in range(WEBHOOK_WORKERS):
+        threading.Thread(target=webhook_worker, name=f"webhook-worker-{i}", daemon=True).start()
+
+start_webhook_workers()
+
 @app.route('/webhook', methods=['POST'])
 def webhook():
     """Handle incoming webhooks from Twilio Conversational Intelligence"""
     try:
-        # Get the JSON data from the webhook
-        data = request.get_json()
-        
-        # Store the data
-        received_data.append(data)
-        
-        # Print the complete webhook data to console with detailed formatting
-        print("\n" + "="*80)
-        print("WEBHOOK RECEIVED - COMPLETE PAYLOAD DETAILS")
-        print("="*80)
-        
-        # Print raw JSON with pretty formatting
-        print("RAW PAYLOAD:")
-        print("-" * 40)
-        print(json.dumps(data, indent=4, sort_keys=True))
-        print("-" * 40)
-        
-        # Print detailed breakdown of payload structure
-        print("\nPAYLOAD STRUCTURE ANALYSIS:")
-        print("-" * 40)
-        if data:
-            for key, value in data.items():
-                print(f"KEY: {key}")
-                print(f"  TYPE: {type(value).__name__}")
-                if isinstance(value, dict):
-                    print(f"  NESTED KEYS: {list(value.keys())}")
-                elif isinstance(value, list):
-                    print(f"  LIST LENGTH: {len(value)}")
-                    if value and isinstance(value[0], dict):
-                        print(f"  FIRST ITEM KEYS: {list(value[0].keys())}")
-                else:
-                    print(f"  VALUE: {value}")
-                print()
-        
-        # Handle different types of webhooks with more detailed output
-        if 'TranscriptSid' in data:
-            print(f"TRANSCRIPTION UPDATE DETAILS:")
-            print(f"  Transcript SID: {data.get('TranscriptSid')}")
-            print(f"  Status: {data.get('Status')}")
-            print(f"  All transcription fields: {[k for k in data.keys() if 'transcript' in k.lower()]}")
-            
-            if data.get('Status') == 'completed':
-                print("  → Transcription completed!")
-            elif data.get('Status') == 'in-progress':
-                print("  → Transcription in progress...")
-                
-        if 'OperatorResults' in data:
-            print(f"OPERATOR RESULTS DETAILS:")
-            for i, result in enumerate(data['OperatorResults']):
-                print(f"  Result #{i+1}:")
-                print(f"    Operator: {result.get('operator_type')}")
-                print(f"    Result: {result.get('result')}")
-                print(f"    All keys: {list(result.keys())}")
-        
-        # Handle real-time transcription streaming with more details
-        if 'Channel' in data and 'Text' in data:
-            print(f"REAL-TIME TRANSCRIPTION DETAILS:")
-            print(f"  Channel: {data['Channel']}")
-            print(f"  Text: '{data['Text']}'")
-            print(f"  Partial: {data.get('Partial', 'Not specified')}")
-            print(f"  Timestamp: {data.get('Timestamp', 'Not provided')}")
-            print(f"  All transcription keys: {[k for k in data.keys()]}")
-            
-            if data.get('Partial'):
-                print("  → (Partial transcription)")
-            else:
-                print("  → (Final transcription)")
-        
-        # Print any additional fields not covered above
-        known_fields = {'TranscriptSid', 'Status', 'OperatorResults', 'Channel', 'Text', 'Partial', 'Timestamp'}
-        additional_fields = set(data.keys()) - known_fields
-        if additional_fields:
-            print(f"ADDITIONAL FIELDS:")
-            for field in sorted(additional_fields):
-                print(f"  {field}: {data[field]}")
-        
-        print("="*80)
-        
-        return jsonify({"status": "success"}), 200
+        # Get the JSON data from the webhook and hand it off to the worker pool
+        data = orjson.loads(request.get_data())
+        webhook_queue.put_nowait(data)
+        return ojson({"status": "queued"}, 200)
         
+    except orjson.JSONDecodeError as e:
+        logger.error(f"Invalid webhook JSON: {str(e)}")
+        return ojson({"error": "invalid JSON payload"}, 400)
+    except queue.Full:
+        # Let Twilio retry later instead of blocking the request thread
+        logger.warning("Webhook queue full - rejecting webhook")
+        return ojson({"error": "webhook queue full"}, 503)
     except Exception as e:
-        print(f"Error processing webhook: {str(e)}")
-        print(f"Raw request data: {request.get_data()}")
-        return jsonify({"error": str(e)}), 500
+        logger.error(f"Error processing webhook: {str(e)}")
+        logger.error(f"Raw request data: {request.get_data()}")
+        return ojson({"error": str(e)}, 500)
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint for cloud deployments"""
-    return jsonify({
+    return ojson({
         "status": "healthy",
         "service": "intelligence-webhook",
         "environment": deployment_env,
@@ -128,34 +197,58 @@ def health_check():
 @app.route('/status', methods=['GET'])
 def status():
     """Status endpoint with detailed information"""
-    return jsonify({
+    with received_data_lock:
+        etag = current_etag()
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        webhooks_received = len(received_data)
+        last_webhook = received_data[-1] if received_data else None
+    return ojson({
         "status": "running",
         "environment": deployment_env,
-        "webhooks_received": len(received_data),
-        "last_webhook": received_data[-1] if received_data else None,
+        "webhooks_received": webhooks_received,
+        "last_webhook": last_webhook,
         "ngrok_available": NGROK_AVAILABLE
-    })
+    }, headers={'ETag': etag, 'Cache-Control': 'max-age=2'})
 
 @app.route('/data', methods=['GET'])
 def get_data():
     """Get all received webhook data - useful for dashboards"""
-    return jsonify({
-        "total_webhooks": len(received_data),
-        "data": received_data
-    })
+    with received_data_lock:
+        etag = current_etag()
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        data = list(received_data)
+
+    def generate():
+        # Stream the JSON document one webhook at a time instead of serializing it in one piece
+        yield b'{"total_webhooks":' + str(len(data)).encode() + b',"data":['
+        for i, item in enumerate(data):
+            if i:
+                yield b','
+            yield orjson.dumps(item)
+        yield b']}'
+
+    return Response(generate(), mimetype='application/json',
+                    headers={'ETag': etag, 'Cache-Control': 'max-age=2'})
 
 @app.route('/data/clear', methods=['POST'])
 def clear_data():
     """Clear all stored webhook data"""
-    global received_data
-    received_data = []
-    return jsonify({"status": "cleared", "webhooks_received": 0})
+    global data_version
+    with received_data_lock:
+        received_data.clear()
+        data_version += 1
+    return ojson({"status": "cleared", "webhooks_received": 0})
 
 def setup_ngrok():
     """Setup ngrok tunnel (only in local development)"""
     if not NGROK_AVAILABLE:
         print("Warning: pyngrok not available. Skipping ngrok setup.")
         return None
+    from pyngrok import ngrok
         
     ngrok_domain = os.getenv('NGROK_DOMAIN')
     
@@ -196,18 +289,24 @@ if __name__ == "__main__":
         print("Press Ctrl+C to stop the server")
         print("="*60)
         
-        # Run the Flask server with environment-aware host
-        if deployment_env in ['render', 'heroku', 'aws', 'gcp']:
-            host = '0.0.0.0'  # Bind to all interfaces for cloud deployment
+        # Use the Flask development server only for local development
+        if deployment_env == 'local':
+            host = '0.0.0.0'  # Use 0.0.0.0 for local to allow external access
+            app.run(host=host, port=PORT, debug=True)
         else:
-            host = '0.0.0.0'  # Also use 0.0.0.0 for local to allow external access
-            
-        app.run(host=host, port=PORT, debug=(deployment_env == 'local'))
+            # Cloud deployments run under gunicorn (single worker, threaded)
+            print(f"Starting gunicorn for {deployment_env} environment")
+            base_dir = os.path.dirname(os.path.abspath(__file__))
+            os.execvp('gunicorn', [
+                'gunicorn', '--chdir', base_dir,
+                '-c', os.path.join(base_dir, 'gunicorn_conf.py'), 'server:app'
+            ])
         
     except KeyboardInterrupt:
         print("\nShutting down server...")
         if deployment_env == 'local' and NGROK_AVAILABLE:
             try:
+                from pyngrok import ngrok
                 ngrok.disconnect(PORT)
             except:
                 pass  # Ignore errors during shutdown
@@ -2,18 +2,24 @@
 # Enhanced LLM client with OpenAI Functions support
 # Maintains backward compatibility with existing LLM client
 
-import asyncio
+import functools
 import json
 import logging
 import os
+import re
+import orjson
+from collections import defaultdict
 from typing import Dict, Any, List, Optional, AsyncGenerator
 from dataclasses import dataclass
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 from tools.banking_tools_enhanced import get_enhanced_banking_tools, FunctionResult
 
 logger = logging.getLogger(__name__)
 
+# Splits function results into sentences for streaming
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
 @dataclass
 class ConversationConfig:
     sentence_end_patterns = ['.', '!', '?', '\n']
@@ -21,6 +27,58 @@ class ConversationConfig:
     max_buffer_size = 1000
     openai_model = os.getenv('OPENAI_MODEL')  # Must be set in environment variables
 
+# Shared async OpenAI client so all EnhancedLLMClient instances reuse one connection pool
+# and stream completions without blocking the event loop
+_OAI_CLIENT = None
+
+def _get_client() -> AsyncOpenAI:
+    global _OAI_CLIENT
+    if _OAI_CLIENT is None:
+        _OAI_CLIENT = AsyncOpenAI(max_retries=2, timeout=30.0)
+    return _OAI_CLIENT
+
+# server.build_agent_context, resolved once on first use to avoid a circular import at load time
+_build_agent_context = None
+
+def _agent_context(agent_name: str, customer_profile: dict = None) -> str:
+    global _build_agent_context
+    if _build_agent_context is None:
+        from server import build_agent_context
+        _build_agent_context = build_agent_context
+    return _build_agent_context(agent_name, customer_profile)
+
+def _empty_tool_call() -> dict:
+    """Accumulator for a streamed tool call"""
+    return {'id': '', 'function': {'name': '', 'arguments': ''}}
+
+@functools.lru_cache(maxsize=64)
+def _system_prompt(context: str, language: str, mode: str) -> str:
+    """Build the system prompt for an agent context and language.
+
+    mode is "text" for single-prompt completions and "history" for completions
+    from the chat history. The result only depends on its arguments, so it is
+    cached and reused across LLM turns.
+    """
+    if mode == "history":
+        language_instruction = (
+            f"Speak in {language}, but you can switch languages if needed to English and Latin American Spanish."
+        )
+    else:
+        language_instruction = (
+            f"Speak in {language}. But respect user's request if they ask to switch language.\n"
+        )
+    return (
+        f"{context}\n\n"
+        f"You are talking to a customer through a phone call. "
+        f"{language_instruction}"
+        f"Respond conversationally. Avoid special characters or emojis. Optimize responses for speech to text.\n"
+        f"IMPORTANT: Use the available functions when appropriate. For banking requests, use banking functions. "
+        f"For account access issues, use help functions. Don't provide banking information without using the proper function.\n"
+        f"If you need to route to a specialist agent (Sunny, Max, or Io), "
+        f"provide a helpful response first, then add #route_to:<AgentName> at the very end. "
+        f"The routing command #route_to:<AgentName> will NOT be spoken to the customer."
+    )
+
 class EnhancedLLMClient:
     """Enhanced LLM client with OpenAI Functions support"""
     
@@ -28,13 +86,13 @@ class EnhancedLLMClient:
         self.config = config
         
         # Add debugging for OpenAI client creation
-        logger.info(f"[DEBUG] About to create OpenAI() client in EnhancedLLMClient")
+        logger.info(f"[DEBUG] About to create AsyncOpenAI() client in EnhancedLLMClient")
         
         try:
-            self.client = OpenAI()
-            logger.info(f"[DEBUG] OpenAI() client created successfully in EnhancedLLMClient")
+            self.client = _get_client()
+            logger.info(f"[DEBUG] AsyncOpenAI() client created successfully in EnhancedLLMClient")
         except Exception as e:
-            logger.error(f"[ERR] Failed to create OpenAI() client in EnhancedLLMClient: {e}")
+            logger.error(f"[ERR] Failed to create AsyncOpenAI() client in EnhancedLLMClient: {e}")
             import traceback
             logger.error(f"[ERR] Enhanced OpenAI client traceback:\n{traceback.format_exc()}")
             raise
@@ -74,52 +132,31 @@ class EnhancedLLMClient:
         """Get completion with OpenAI Functions support"""
         
         # Build agent context (reusing existing function)
-        from server import build_agent_context
-        context = build_agent_context(agent_name, customer_profile)
+        context = _agent_context(agent_name, customer_profile)
         
         messages = [
-            {
-                "role": "system",
-                "content": (
-                    f"{context}\n\n"
-                    f"You are talking to a customer through a phone call. "
-                    f"Speak in {language}. But respect user's request if they ask to switch language.\n"
-                    f"Respond conversationally. Avoid special characters or emojis. Optimize responses for speech to text.\n"
-                    f"IMPORTANT: Use the available functions when appropriate. For banking requests, use banking functions. "
-                    f"For account access issues, use help functions. Don't provide banking information without using the proper function.\n"
-                    f"If you need to route to a specialist agent (Sunny, Max, or Io), "
-                    f"provide a helpful response first, then add #route_to:<AgentName> at the very end. "
-                    f"The routing command #route_to:<AgentName> will NOT be spoken to the customer."
-                )
-            },
+            {"role": "system", "content": _system_prompt(context, language, "text")},
             {"role": "user", "content": text}
         ]
         
-        # Prepare function call
-        def sync_stream():
-            return self.client.chat.completions.create(
+        try:
+            stream = await self.client.chat.completions.create(
                 model=self.config.openai_model,
                 messages=messages,
                 tools=self.function_schemas if self.function_schemas else None,
                 tool_choice="auto" if self.function_schemas else None,
                 stream=True
             )
-        
-        try:
-            stream = await asyncio.to_thread(sync_stream)
             
-            # Collect the response and any function calls
-            response_content = []
-            function_calls = []
-            current_tool_call = None
+            # Collect any function calls (content is yielded as it arrives)
+            function_calls = defaultdict(_empty_tool_call)
             
-            for chunk in stream:
+            async for chunk in stream:
                 choice = chunk.choices[0]
                 delta = choice.delta
                 
                 # Handle regular content
                 if delta.content:
-                    response_content.append(delta.content)
                     yield delta.content
                 
                 # Handle function calls
@@ -127,16 +164,9 @@ class EnhancedLLMClient:
                     for tool_call in delta.tool_calls:
                         if tool_call.index is not None:
                             # Start of new tool call or continuation
-                            if len(function_calls) <= tool_call.index:
-                                function_calls.extend([None] * (tool_call.index + 1 - len(function_calls)))
-                            
-                            if function_calls[tool_call.index] is None:
-                                function_calls[tool_call.index] = {
-                                    'id': tool_call.id or '',
-                                    'function': {'name': '', 'arguments': ''}
-                                }
-                            
                             current_tool_call = function_calls[tool_call.index]
+                            if not current_tool_call['id']:
+                                current_tool_call['id'] = tool_call.id or ''
                             
                             if tool_call.function:
                                 if tool_call.function.name:
@@ -144,7 +174,8 @@ class EnhancedLLMClient:
                                 if tool_call.function.arguments:
                                     current_tool_call['function']['arguments'] += tool_call.function.arguments
             
-            # Execute function calls if any
+            # Execute function calls if any (in tool call index order)
+            function_calls = [function_calls[index] for index in sorted(function_calls)]
             if function_calls:
                 yield "\n\n"  # Add some space before function execution
                 
@@ -156,7 +187,7 @@ class EnhancedLLMClient:
                         if tool_call['function']['name'] in ['get_account_balance', 'help_with_account_access', 'initiate_transfer']:
                             # Add customer_phone to function arguments for banking functions
                             try:
-                                args = json.loads(tool_call['function']['arguments']) if tool_call['function']['arguments'] else {}
+                                args = orjson.loads(tool_call['function']['arguments']) if tool_call['function']['arguments'] else {}
                                 if customer_phone and 'language' not in args:
                                     args['language'] = language
                                 if customer_phone and 'customer_phone' not in args:
@@ -169,14 +200,13 @@ class EnhancedLLMClient:
                                 )
                                 
                                 if result.success:
-                                    # Stream the function result
-                                    words = result.content.split()
-                                    for i, word in enumerate(words):
+                                    # Stream the function result sentence by sentence (TTS handles pacing)
+                                    sentences = SENTENCE_BOUNDARY.split(result.content.strip())
+                                    for i, sentence in enumerate(sentences):
                                         if i == 0:
-                                            yield word
+                                            yield sentence
                                         else:
-                                            yield f" {word}"
-                                        await asyncio.sleep(0.02)  # Small delay for natural streaming
+                                            yield f" {sentence}"
                                 else:
                                     logger.error(f"[FUNC] Function execution failed: {result.content}")
                                     yield f"Desculpe, houve um erro ao processar sua solicitação."
@@ -203,47 +233,30 @@ class EnhancedLLMClient:
         """Get completion from history with OpenAI Functions support"""
         
         # Build agent context (reusing existing function)
-        from server import build_agent_context
-        context = build_agent_context(agent_name, customer_profile)
+        context = _agent_context(agent_name, customer_profile)
         
         messages = [
-            {"role": "system", "content": (
-                f"{context}\n\n"
-                f"You are talking to a customer through a phone call. "
-                f"Speak in {language}, but you can switch languages if needed to English and Latin American Spanish."
-                f"Respond conversationally. Avoid special characters or emojis. Optimize responses for speech to text.\n"
-                f"IMPORTANT: Use the available functions when appropriate. For banking requests, use banking functions. "
-                f"For account access issues, use help functions. Don't provide banking information without using the proper function.\n"
-                f"If you need to route to a specialist agent (Sunny, Max, or Io), "
-                f"provide a helpful response first, then add #route_to:<AgentName> at the very end. "
-                f"The routing command #route_to:<AgentName> will NOT be spoken to the customer."
-            )}
+            {"role": "system", "content": _system_prompt(context, language, "history")}
         ] + history
         
-        # Prepare function call
-        def sync_stream():
-            return self.client.chat.completions.create(
+        try:
+            stream = await self.client.chat.completions.create(
                 model=self.config.openai_model,
                 messages=messages,
                 tools=self.function_schemas if self.function_schemas else None,
                 tool_choice="auto" if self.function_schemas else None,
                 stream=True
             )
-        
-        try:
-            stream = await asyncio.to_thread(sync_stream)
             
-            # Collect the response and any function calls
-            response_content = []
-            function_calls = []
+            # Collect any function calls (content is yielded as it arrives)
+            function_calls = defaultdict(_empty_tool_call)
             
-            for chunk in stream:
+            async for chunk in stream:
                 choice = chunk.choices[0]
                 delta = choice.delta
                 
                 # Handle regular content
                 if delta.content:
-                    response_content.append(delta.content)
                     yield delta.content
                 
                 # Handle function calls
@@ -251,16 +264,9 @@ class EnhancedLLMClient:
                     for tool_call in delta.tool_calls:
                         if tool_call.index is not None:
                             # Start of new tool call or continuation
-                            if len(function_calls) <= tool_call.index:
-                                function_calls.extend([None] * (tool_call.index + 1 - len(function_calls)))
-                            
-                            if function_calls[tool_call.index] is None:
-                                function_calls[tool_call.index] = {
-                                    'id': tool_call.id or '',
-                                    'function': {'name': '', 'arguments': ''}
-                                }
-                            
                             current_tool_call = function_calls[tool_call.index]
+                            if not current_tool_call['id']:
+                                current_tool_call['id'] = tool_call.id or ''
                             
                             if tool_call.function:
                                 if tool_call.function.name:
@@ -268,7 +274,8 @@ class EnhancedLLMClient:
                                 if tool_call.function.arguments:
                                     current_tool_call['function']['arguments'] += tool_call.function.arguments
             
-            # Execute function calls if any
+            # Execute function calls if any (in tool call index order)
+            function_calls = [function_calls[index] for index in sorted(function_calls)]
             if function_calls:
                 for tool_call in function_calls:
                     if tool_call and tool_call['function']['name']:
@@ -277,7 +284,7 @@ class EnhancedLLMClient:
                         # Execute the function
                         if tool_call['function']['name'] in ['get_account_balance', 'help_with_account_access', 'initiate_transfer']:
                             try:
-                                args = json.loads(tool_call['function']['arguments']) if tool_call['function']['arguments'] else {}
+                                args = orjson.loads(tool_call['function']['arguments']) if tool_call['function']['arguments'] else {}
                                 if customer_phone and 'language' not in args:
                                     args['language'] = language
                                 if customer_phone and 'customer_phone' not in args:
@@ -290,14 +297,13 @@ class EnhancedLLMClient:
                                 )
                                 
                                 if result.success:
-                                    # Stream the function result
-                                    words = result.content.split()
-                                    for i, word in enumerate(words):
+                                    # Stream the function result sentence by sentence (TTS handles pacing)
+                                    sentences = SENTENCE_BOUNDARY.split(result.content.strip())
+                                    for i, sentence in enumerate(sentences):
                                         if i == 0:
-                                            yield word
+                                            yield sentence
                                         else:
-                                            yield f" {word}"
-                                        await asyncio.sleep(0.02)  # Small delay for natural streaming
+                                            yield f" {sentence}"
                                 else:
                                     logger.error(f"[FUNC] Function execution failed: {result.content}")
                                     yield f"Desculpe, houve um erro ao processar sua solicitação."
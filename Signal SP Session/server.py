@@ -1,11 +1,16 @@
 import asyncio
+import atexit
+import functools
+import itertools
 import json
 import logging
+import orjson
+import signal
 import sys
 import aiohttp_cors
-from typing import Dict, Any
+from typing import Dict, Any, Union
 from dataclasses import dataclass
-from openai import OpenAI
+from openai import AsyncOpenAI
 import os
 from dotenv import load_dotenv
 from aiohttp import web, WSMsgType
@@ -17,8 +22,8 @@ from datetime import datetime, timezone
 import re
 from twilio.rest import Client
 import decimal
-from collections import defaultdict
-import pandas as pd
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 import csv
 from pathlib import Path
 import math
@@ -30,11 +35,30 @@ except ImportError:
     NGROK_AVAILABLE = False
     logger.info(f"{Fore.YELLOW}[SYS] pyngrok not available - ngrok features disabled{Style.RESET_ALL}")
 
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
 from tools.personalization import get_personalization_context # Integração com o Twilio Segment para personalização das interações
 
 # Initialize colorama
 colorama_init(autoreset=True)
 
+# Precomputed log prefixes for the voice handler hot paths
+_RST = Style.RESET_ALL
+_SYS = f"{Fore.BLUE}[SYS] "
+_ERR = f"{Fore.RED}[ERR] "
+_WARN = f"{Fore.YELLOW}[WARN] "
+_CX = f"{Fore.CYAN}[CX] "
+_AGENT = f"{Fore.YELLOW}[AGENT] "
+_SPI = f"{Fore.MAGENTA}[SPI] "
+_STT = f"{Fore.CYAN}[STT] "
+_LANG = f"{Fore.YELLOW}[LANG] "
+_ROUTE = f"{Fore.YELLOW}[ROUTE] "
+_WS = f"{Fore.CYAN}[WS] "
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -43,47 +67,19 @@ DEBUG_MODE = os.getenv("DEBUG_MODE", "false").lower() == "true"
 
 # Test debug logging early
 if DEBUG_MODE:
-    import datetime
-    timestamp = datetime.datetime.now().strftime("%H:%M:%S.%f")
+    timestamp = datetime.now().strftime("%H:%M:%S.%f")
     print(f"{timestamp} [DEBUG] Debug mode is ENABLED - detailed logging active")
 
 # OpenAI Functions feature disabled to simplify deployment
 
-# Initialize Twilio client
-from twilio.http.http_client import TwilioHttpClient
-
-# Disable Twilio SDK HTTP logging
-if not DEBUG_MODE:
-    # Monkey patch print function globally to suppress Twilio HTTP logs
-    original_print = print
-    
-    def filtered_print(*args, **kwargs):
-        # Suppress Twilio HTTP debug prints
-        if args and isinstance(args[0], str):
-            content = str(args[0])
-            # Check for Twilio HTTP log patterns
-            twilio_patterns = [
-                "-- BEGIN Twilio API Request --",
-                "-- END Twilio API Request --", 
-                "Response Status Code:",
-                "Response Headers:",
-                "Query Params:",
-                "Headers:"
-            ]
-            if any(pattern in content for pattern in twilio_patterns):
-                return  # Suppress this print
-        # Allow all other prints
-        return original_print(*args, **kwargs)
-    
-    # Replace print globally
-    import builtins
-    builtins.print = filtered_print
-
 # Initialize Twilio client
 twilio_client = Client()
 
-# In-memory storage for intelligence events
-intel_log = [] 
+# In-memory storage for intelligence events (most recent INTEL_LOG_MAX)
+INTEL_LOG_MAX = int(os.getenv("INTEL_LOG_MAX", "5000"))
+intel_log = deque(maxlen=INTEL_LOG_MAX)
+# transcript_sid of every persisted result, including ones already evicted from intel_log
+known_sids = set()
 
 DATA_PATH = Path("data")
 DATA_PATH.mkdir(exist_ok=True)
@@ -94,6 +90,19 @@ if not NDJSON_FILE.exists():
 RAW_NDJSON_FILE = DATA_PATH / "intel_raw_results.ndjson"
 RAW_NDJSON_FILE.touch(exist_ok=True)
 
+# Long-lived append handles so persisting a result doesn't open/close both files each time
+NDJSON_FH = open(NDJSON_FILE, "ab", buffering=64 * 1024)
+RAW_NDJSON_FH = open(RAW_NDJSON_FILE, "ab", buffering=64 * 1024)
+atexit.register(NDJSON_FH.close)
+atexit.register(RAW_NDJSON_FH.close)
+
+# (flat, raw) results waiting for _persist_writer, which writes them off the event loop
+PERSIST_Q = asyncio.Queue()
+PERSIST_BATCH_MAX = 64
+# fsync after every written batch, for deployments that can't afford to lose results on a crash
+NDJSON_FSYNC = os.getenv("NDJSON_FSYNC", "false").lower() in ['true', '1', 'yes']
+_persist_task = None
+
 def log_debug(message):
     if DEBUG_MODE:
         # Use direct print with timestamp since logger might not be initialized yet
@@ -101,125 +110,216 @@ def log_debug(message):
         timestamp = datetime.datetime.now().strftime("%H:%M:%S.%f")
         print(f"{timestamp} [DEBUG] {message}")
 
+SCORE_RXS = {
+    "CSAT": re.compile(r"CSAT Score:\s*(\d+)"),
+    "CES": re.compile(r"CES Score:\s*(\d+)"),
+}
+
 def extract_score(text, key):
-    match = re.search(rf"{key} Score:\s*(\d+)", text)
+    match = SCORE_RXS[key].search(text)
     return int(match.group(1)) if match else None
 
 def persist_result(payload: dict):
+    """Record a result in memory now and queue it for the NDJSON files; must run inside the event loop"""
+    global _persist_task
     flat_result = flatten_intel_result(payload)
     intel_log.append(flat_result)
+    known_sids.add(flat_result["transcript_sid"])
+    aggregate_intel_result(flat_result)
 
-    save_to_ndjson(flat_result, target=NDJSON_FILE)  # flat
-    save_to_ndjson(payload, target=RAW_NDJSON_FILE)  # raw
+    if _persist_task is None or _persist_task.done():
+        _persist_task = asyncio.create_task(_persist_writer())
+    PERSIST_Q.put_nowait((flat_result, payload))
 
-    log_debug(f"[PERSIST] Saved flat + raw intelligence for {payload['data']['transcript']['sid']}")
+    log_debug(f"[PERSIST] Queued flat + raw intelligence for {payload['data']['transcript']['sid']}")
 
 
+def _handle_csat(op, out):
+    score = extract_score(op.get("text_result", "") or "", "CSAT")
+    if score is not None:
+        out["csat_score"] = score
 
+def _handle_ces(op, out):
+    score = extract_score(op.get("text_result", "") or "", "CES")
+    if score is not None:
+        out["ces_score"] = score
+
+def _handle_hall(op, out):
+    out["hallucination_occurrences"] = 1
+
+def _handle_legal(op, out):
+    out["legal_risk_score"] = int(op.get("predicted_probability", 0) * 100)
+
+def _handle_sent(op, out):
+    if "label_probabilities" not in op:
+        return
+    probs = op["label_probabilities"]
+    out["positive_sentiment_score"] = int(probs.get("positive", 0) * 100)
+    out["neutral_sentiment_score"] = int(probs.get("neutral", 0) * 100)
+    out["negative_sentiment_score"] = int(probs.get("negative", 0) * 100)
+
+# Operator-name substring -> handler. Not exclusive: "Services Sentiment"
+# matches both "ces" and "sentiment", so every matching handler runs.
+OP_HANDLERS = {
+    "csat": _handle_csat,
+    "ces": _handle_ces,
+    "hallucination": _handle_hall,
+    "legal": _handle_legal,
+    "sentiment": _handle_sent,
+}
+
+@functools.lru_cache(maxsize=128)
+def op_handlers_for(name: str) -> tuple:
+    """Handlers matching an operator name; the same few operator names recur in every result"""
+    name = name.lower()
+    return tuple(handler for key, handler in OP_HANDLERS.items() if key in name)
 
 def flatten_intel_result(payload: dict) -> dict:
+    data = payload["data"]
+    transcript = data["transcript"]
     out = {
         "ts": payload.get("ts"),
-        "transcript_sid": payload["data"]["transcript"]["sid"],
-        "language": payload["data"]["transcript"].get("language"),
-        "duration": payload["data"]["transcript"].get("duration"),
-        "status": payload["data"]["transcript"].get("status"),
+        "transcript_sid": transcript["sid"],
+        "language": transcript.get("language"),
+        "duration": transcript.get("duration"),
+        "status": transcript.get("status"),
     }
 
-    for op in payload["data"].get("operators", []):
-        name = op.get("name", "").lower()
-        if "csat" in name:
-            score = extract_score(op.get("text_result", "") or "", "CSAT")
-            if score is not None:
-                out["csat_score"] = score
-        if "ces" in name:
-            score = extract_score(op.get("text_result", "") or "", "CES")
-            if score is not None:
-                out["ces_score"] = score
-        if "hallucination" in name:
-            out["hallucination_occurrences"] = 1
-        if "legal" in name:
-            out["legal_risk_score"] = int(op.get("predicted_probability", 0) * 100)
-        if "sentiment" in name and "label_probabilities" in op:
-            probs = op["label_probabilities"]
-            out["positive_sentiment_score"] = int(probs.get("positive", 0) * 100)
-            out["neutral_sentiment_score"] = int(probs.get("neutral", 0) * 100)
-            out["negative_sentiment_score"] = int(probs.get("negative", 0) * 100)
+    for op in data.get("operators", []):
+        for handler in op_handlers_for(op.get("name") or ""):
+            handler(op, out)
 
     return out
 
-def save_to_ndjson(result: dict, target: Path):
-    with open(target, "a", encoding="utf-8") as f:
-        json.dump(result, f, ensure_ascii=False, default=safe_json)
-        f.write("\n")
-
-def load_aggregated_intel_results(group_by: str = "day") -> dict:
-    if not NDJSON_FILE.exists():
-        return {}
-
+def save_to_ndjson(batch: list):
+    """Append (flat, raw) results to both NDJSON files with one write and flush per file"""
+    NDJSON_FH.write(b"".join(orjson.dumps(flat, default=safe_json, option=orjson.OPT_APPEND_NEWLINE) for flat, _ in batch))
+    RAW_NDJSON_FH.write(b"".join(orjson.dumps(raw, default=safe_json, option=orjson.OPT_APPEND_NEWLINE) for _, raw in batch))
+    # Flushed per batch; the files are also read back by the intelligence endpoints
+    NDJSON_FH.flush()
+    RAW_NDJSON_FH.flush()
+    if NDJSON_FSYNC:
+        os.fsync(NDJSON_FH.fileno())
+        os.fsync(RAW_NDJSON_FH.fileno())
+
+async def _persist_writer():
+    while True:
+        batch = [await PERSIST_Q.get()]
+        while len(batch) < PERSIST_BATCH_MAX and not PERSIST_Q.empty():
+            batch.append(PERSIST_Q.get_nowait())
+        try:
+            await asyncio.to_thread(save_to_ndjson, batch)
+        except Exception as e:
+            logger.error(f"{_ERR}Failed to persist {len(batch)} intelligence result(s): {e}{_RST}\n")
+
+def _flush_persist_queue():
+    """Write results still queued at shutdown; registered after the closes so it runs first"""
+    batch = []
+    while not PERSIST_Q.empty():
+        batch.append(PERSIST_Q.get_nowait())
+    if batch:
+        save_to_ndjson(batch)
+
+atexit.register(_flush_persist_queue)
+
+# Running totals per group label, kept up to date by persist_result so the dashboard
+# aggregates never re-read the NDJSON file
+AGG_GROUPS = ("day", "week", "month", "year")
+AGG_STATE = {group_by: {} for group_by in AGG_GROUPS}
+# Materialized load_aggregated_intel_results output per group_by, dropped whenever a result is folded in
+_AGG_VIEWS = {}
+
+def _agg_number(value):
+    """Numeric value of a flat result field, or None when missing/NaN/non-numeric"""
+    if value is None or isinstance(value, bool):
+        return None
     try:
-        df = pd.read_json(NDJSON_FILE, lines=True)
-    except Exception as e:
-        log_debug(f"[WARN] Failed to read CSV for aggregation: {e}")
-        return {}
-
-    # Robust datetime parsing
-    df["ts"] = pd.to_datetime(df["ts"], errors="coerce", utc=True)
-    df = df.dropna(subset=["ts"])
-
-    if df.empty:
-        return {}
-
-    if group_by == "week":
-        df["group"] = df["ts"].dt.strftime("%Y-W%U")
-    elif group_by == "month":
-        df["group"] = df["ts"].dt.strftime("%Y-%m")
-    elif group_by == "year":
-        df["group"] = df["ts"].dt.year.astype(str)
-    else:
-        df["group"] = df["ts"].dt.strftime("%Y-%m-%d")
-
-    results = {}
-    grouped = df.groupby("group")
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(number) else number
 
-    for label, group in grouped:
-        def safe_avg(col):
-            if col in group.columns:
-                values = group[col].dropna().astype(float)
-                return round(values.mean(), 2) if not values.empty else None
+def _agg_timestamp(value):
+    if isinstance(value, datetime):
+        ts = value
+    else:
+        try:
+            ts = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
             return None
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+
+def _agg_labels(ts: datetime) -> tuple:
+    """Day ("%Y-%m-%d"), week ("%Y-W%U"), month and year labels from a single strftime call"""
+    stamp = ts.strftime("%Y-%m-%d %Y-W%U")
+    day = stamp[:10]
+    return day, stamp[11:], day[:7], day[:4]
+
+def aggregate_intel_result(flat_result: dict):
+    """Fold one flattened intelligence result into the running per-day/week/month/year totals"""
+    ts = _agg_timestamp(flat_result.get("ts"))
+    if ts is None:
+        return
+    csat = _agg_number(flat_result.get("csat_score"))
+    ces = _agg_number(flat_result.get("ces_score"))
+    hallucinations = _agg_number(flat_result.get("hallucination_occurrences")) or 0
+    legal_risk = _agg_number(flat_result.get("legal_risk_score")) or 0
+    sentiment = [
+        f"{key}_sentiment" for key in ("positive", "neutral", "negative")
+        if (_agg_number(flat_result.get(f"{key}_sentiment_score")) or 0) > 50
+    ]
+
+    _AGG_VIEWS.clear()
+    for group_by, label in zip(AGG_GROUPS, _agg_labels(ts)):
+        agg = AGG_STATE[group_by].get(label)
+        if agg is None:
+            agg = AGG_STATE[group_by][label] = {
+                "csat_sum": 0.0, "csat_count": 0, "ces_sum": 0.0, "ces_count": 0, "count": 0,
+                "hallucination_count": 0.0, "legal_risk_score": 0.0,
+                "positive_sentiment": 0, "neutral_sentiment": 0, "negative_sentiment": 0,
+            }
+        agg["count"] += 1
+        if csat is not None:
+            agg["csat_sum"] += csat
+            agg["csat_count"] += 1
+        if ces is not None:
+            agg["ces_sum"] += ces
+            agg["ces_count"] += 1
+        agg["hallucination_count"] += hallucinations
+        agg["legal_risk_score"] += legal_risk
+        for field in sentiment:
+            agg[field] += 1
 
-
-        def safe_sum(col):
-            return int(group[col].fillna(0).astype(float).sum()) if col in group.columns else 0
-
-        sentiment_cols = [
-            "positive_sentiment_score",
-            "neutral_sentiment_score",
-            "negative_sentiment_score"
-        ]
-
-        # Count number of rows where each sentiment score exceeds 50%
-        def count_sentiment(col):
-            return int((group[col].dropna().astype(float) > 50).sum()) if col in group.columns else 0
-
-        results[label] = {
-            "avgCSAT": safe_avg("csat_score"),
-            "avgCES": safe_avg("ces_score"),
-            "count": len(group),
-            "hallucination_count": int(group["hallucination_occurrences"].fillna(0).sum()) if "hallucination_occurrences" in group else 0,
-            "legal_risk_score": int(group["legal_risk_score"].fillna(0).sum()) if "legal_risk_score" in group else 0,
-            "positive_sentiment": count_sentiment("positive_sentiment_score"),
-            "neutral_sentiment": count_sentiment("neutral_sentiment_score"),
-            "negative_sentiment": count_sentiment("negative_sentiment_score"),
+def load_aggregated_intel_results(group_by: str = "day") -> dict:
+    if group_by not in AGG_STATE:
+        group_by = "day"
+    view = _AGG_VIEWS.get(group_by)
+    if view is None:
+        view = _AGG_VIEWS[group_by] = _materialize_aggregates(AGG_STATE[group_by])
+    return view
+
+def _materialize_aggregates(state: dict) -> dict:
+    return {
+        label: {
+            "avgCSAT": round(agg["csat_sum"] / agg["csat_count"], 2) if agg["csat_count"] else None,
+            "avgCES": round(agg["ces_sum"] / agg["ces_count"], 2) if agg["ces_count"] else None,
+            "count": agg["count"],
+            "hallucination_count": int(agg["hallucination_count"]),
+            "legal_risk_score": int(agg["legal_risk_score"]),
+            "positive_sentiment": agg["positive_sentiment"],
+            "neutral_sentiment": agg["neutral_sentiment"],
+            "negative_sentiment": agg["negative_sentiment"],
         }
+        for label, agg in sorted(state.items())
+    }
 
-
-    return results
-
-# Configure logging
-logging.basicConfig(level=logging.INFO, format="%(message)s")
+# Configure logging - LOG_LEVEL=WARNING skips building INFO payload dumps entirely
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+_log_level_valid = LOG_LEVEL in logging.getLevelNamesMapping()
+logging.basicConfig(level=LOG_LEVEL if _log_level_valid else logging.INFO, format="%(message)s")
 logger = logging.getLogger(__name__)
+if not _log_level_valid:
+    logger.warning(f"{_WARN}Unknown LOG_LEVEL {LOG_LEVEL!r}; falling back to INFO{_RST}")
 
 # Early startup debugging and library version checks
 logger.info(f"{Fore.CYAN}[DEBUG] Starting server startup debugging{Style.RESET_ALL}")
@@ -238,13 +338,12 @@ try:
     import openai
     logger.info(f"{Fore.GREEN}[DEBUG] OpenAI library version: {openai.__version__}{Style.RESET_ALL}")
     
-    # Test basic OpenAI client instantiation
-    from openai import OpenAI
+    # Test instantiation of the async client the voice LLM streams through
     logger.info(f"{Fore.CYAN}[DEBUG] OpenAI import successful, testing client creation{Style.RESET_ALL}")
     
     # Test without any arguments first
-    test_client = OpenAI()
-    logger.info(f"{Fore.GREEN}[DEBUG] Basic OpenAI() client creation successful{Style.RESET_ALL}")
+    test_client = AsyncOpenAI()
+    logger.info(f"{Fore.GREEN}[DEBUG] Basic AsyncOpenAI() client creation successful{Style.RESET_ALL}")
     del test_client
     
 except ImportError as e:
@@ -300,31 +399,67 @@ except ImportError as e:
 
 
 def load_recent_events(limit=100):
-    if not NDJSON_FILE.exists():
-        return []
-    try:
-        df = pd.read_json(NDJSON_FILE, on_bad_lines="skip")
-        df["ts"] = pd.to_datetime(df["ts"], errors="coerce", utc=True)
-        df = df.dropna(subset=["ts"])
-        df = df.fillna(value="")  # or .fillna(0) for numeric fields
-
-        records = df.tail(limit).to_dict(orient='records')
-
-        # Ensure all values are JSON-safe
-        def sanitize(record):
-            return {
-                k: (None if pd.isna(v) or v == "" else v)
-                for k, v in record.items()
-            }
+    """Last `limit` intelligence results from memory, with empty-string values as None.
+    intel_log only holds flatten_intel_result output and orjson-decoded lines, so there is no NaN
+    to clean up, and records without an empty string are returned as they are."""
+    recent = list(itertools.islice(reversed(intel_log), limit))
+    recent.reverse()
+    return [
+        {k: (None if v == "" else v) for k, v in record.items()} if "" in record.values() else record
+        for record in recent
+    ]
+
+_TWILIO_SID_RX = re.compile(r"[A-Z]{2}[0-9a-f]{32}")
+
+def transcript_refs(transcript) -> set:
+    """Source SIDs a transcript points at: its customer_key and every string (and SID inside a URL) in
+    its channel - media_properties.source_sid holds the call SID for voice, participants carry the rest"""
+    refs = set()
+    customer_key = getattr(transcript, "customer_key", None)
+    if customer_key:
+        refs.add(customer_key)
+    pending = [getattr(transcript, "channel", None)]
+    while pending:
+        value = pending.pop()
+        if isinstance(value, str):
+            refs.add(value)
+            refs.update(_TWILIO_SID_RX.findall(value))
+        elif isinstance(value, dict):
+            pending.extend(value.values())
+        elif isinstance(value, list):
+            pending.extend(value)
+    return refs
+
+def _parse_text_generation(op) -> dict:
+    # For CSAT, CES, Agent Effectiveness, etc.
+    results = getattr(op, 'text_generation_results', None)
+    if results:
+        # The SDK returns a dict here; attribute access is kept for object-like results
+        text = results.get('result') if isinstance(results, dict) else getattr(results, 'result', None)
+    else:
+        # Fallback to check for direct text result
+        text = getattr(op, 'text_result', None)
+    if DEBUG_MODE:
+        log_debug(f"[INTEL] Text generation result: {text[:100] if text else 'None'}...")
+    return {"text_result": text}
 
-        return [sanitize(r) for r in records]
-    except Exception as e:
-        log_debug(f"[WARN] Failed to load recent events: {e}")
-        return []
-    if not NDJSON_FILE.exists():
-        return []
-    df = pd.read_json(NDJSON_FILE, lines=True)
-    return df.tail(limit).to_dict(orient='records')
+def _parse_extract(op) -> dict:
+    # For entity extraction; extract_results is already among the common fields
+    utterance_results = getattr(op, 'utterance_results', [])
+    if DEBUG_MODE:
+        log_debug(f"[INTEL] Entity extraction: {len(utterance_results)} utterances")
+    return {
+        "match_probability": getattr(op, 'match_probability', None),
+        "extract_match": getattr(op, 'extract_match', None),
+        "utterance_results": utterance_results,
+    }
+
+# Type-specific fields for get_conversation_intelligence; conversation-classify (sentiment)
+# needs nothing beyond the common fields every operator result gets
+OPERATOR_DETAIL_PARSERS = {
+    "text-generation": _parse_text_generation,
+    "extract": _parse_extract,
+}
 
 async def get_conversation_intelligence(request):
     """Get intelligence data for a specific conversation"""
@@ -338,9 +473,9 @@ async def get_conversation_intelligence(request):
         call_sid = None
         try:
             # Get conversation from Twilio Conversations API to extract call_sid from attributes
-            conversation = twilio_client.conversations.v1.conversations(conversation_sid).fetch()
+            conversation = await asyncio.to_thread(twilio_client.conversations.v1.conversations(conversation_sid).fetch)
             if conversation.attributes:
-                attributes = json.loads(conversation.attributes)
+                attributes = orjson.loads(conversation.attributes)
                 call_sid = attributes.get('call_sid')
                 log_debug(f"[INTEL] Found call_sid in conversation attributes: {call_sid}")
         except Exception as e:
@@ -352,63 +487,50 @@ async def get_conversation_intelligence(request):
         operator_results = []
         
         try:
-            transcripts = twilio_client.intelligence.v2.transcripts.list(
+            transcripts = await asyncio.to_thread(
+                twilio_client.intelligence.v2.transcripts.list,
                 limit=50  # Increased limit to find more potential matches
             )
             
             log_debug(f"[INTEL] Found {len(transcripts)} transcripts in Intelligence service")
             
+            # Index every transcript by the SIDs it references, first transcript wins like the old linear scan
+            transcripts_by_ref = {}
+            for transcript in transcripts:
+                for ref in transcript_refs(transcript):
+                    transcripts_by_ref.setdefault(ref, transcript)
+
             # For voice conversations, match by call SID
             if call_sid:
                 log_debug(f"[INTEL] Voice conversation detected, matching by call SID: {call_sid}")
-                
-                for transcript in transcripts:
-                    log_debug(f"[INTEL] Examining transcript {transcript.sid} for call SID {call_sid}")
-                    
-                    match_found = False
-                    
-                    # Strategy 1: String search for call SID in transcript (most reliable)
-                    transcript_str = str(transcript.__dict__)
-                    if call_sid in transcript_str:
-                        match_found = True
-                        log_debug(f"[INTEL] ✓ Matched transcript by call SID string search: {call_sid} -> {transcript.sid}")
-                    
-                    if match_found:
-                        conversation_transcript = transcript
-                        break
+                conversation_transcript = transcripts_by_ref.get(call_sid)
+                if conversation_transcript:
+                    log_debug(f"[INTEL] ✓ Matched transcript by call SID: {call_sid} -> {conversation_transcript.sid}")
             else:
                 # For messaging conversations, match by conversation SID
                 log_debug(f"[INTEL] Messaging conversation detected, matching by conversation SID: {conversation_sid}")
-                
-                for transcript in transcripts:
-                    if conversation_sid in str(transcript.__dict__):
-                        conversation_transcript = transcript
-                        log_debug(f"[INTEL] Matched transcript by conversation SID: {conversation_sid}")
-                        break
+                conversation_transcript = transcripts_by_ref.get(conversation_sid)
+                if conversation_transcript:
+                    log_debug(f"[INTEL] Matched transcript by conversation SID: {conversation_sid}")
             
             # If still no match, try to use local NDJSON data or recent transcript as fallback
             if not conversation_transcript:
                 log_debug(f"[INTEL] No direct match found, trying fallback strategies...")
                 
-                # Strategy 1: Use local NDJSON data if available
-                if NDJSON_FILE.exists():
+                # Strategy 1: Use the most recent locally persisted result, if any
+                recent_transcript_sid = next(
+                    (record["transcript_sid"] for record in reversed(intel_log) if record.get("transcript_sid")), None
+                )
+                if recent_transcript_sid:
+                    log_debug(f"[INTEL] Found recent transcript in local data: {recent_transcript_sid}")
+                    # Try to fetch this transcript from Intelligence API
                     try:
-                        # Read the most recent intelligence results
-                        df = pd.read_json(NDJSON_FILE, lines=True)
-                        if not df.empty and "transcript_sid" in df.columns:
-                            # Get the most recent transcript SID
-                            recent_transcript_sid = df["transcript_sid"].dropna().iloc[-1] if not df["transcript_sid"].dropna().empty else None
-                            
-                            if recent_transcript_sid:
-                                log_debug(f"[INTEL] Found recent transcript in local data: {recent_transcript_sid}")
-                                # Try to fetch this transcript from Intelligence API
-                                try:
-                                    conversation_transcript = twilio_client.intelligence.v2.services(intelligence_service_sid).transcripts(recent_transcript_sid).fetch()
-                                    log_debug(f"[INTEL] Successfully fetched transcript from local data: {recent_transcript_sid}")
-                                except Exception as e:
-                                    log_debug(f"[WARN] Failed to fetch transcript from local data: {e}")
+                        conversation_transcript = await asyncio.to_thread(
+                            twilio_client.intelligence.v2.services(intelligence_service_sid).transcripts(recent_transcript_sid).fetch
+                        )
+                        log_debug(f"[INTEL] Successfully fetched transcript from local data: {recent_transcript_sid}")
                     except Exception as e:
-                        log_debug(f"[WARN] Failed to read local NDJSON file: {e}")
+                        log_debug(f"[WARN] Failed to fetch transcript from local data: {e}")
                 
                 # Strategy 2: If still no match, use the most recent transcript as final fallback
                 if not conversation_transcript and transcripts:
@@ -421,19 +543,24 @@ async def get_conversation_intelligence(request):
         if conversation_transcript:
             log_debug(f"[INTEL] Found transcript: {conversation_transcript.sid}")
             
+            # Sentences and operator results are independent - fetch both at once
+            log_debug(f"[INTEL] Fetching sentences and operator results for transcript: {conversation_transcript.sid}")
+            transcript_ctx = twilio_client.intelligence.v2.transcripts(conversation_transcript.sid)
+            sentences, ops = await asyncio.gather(
+                asyncio.to_thread(transcript_ctx.sentences.list, limit=1000),
+                asyncio.to_thread(transcript_ctx.operator_results.list),
+                return_exceptions=True
+            )
+
             # Get transcript sentences
             try:
-                log_debug(f"[INTEL] Fetching sentences for transcript: {conversation_transcript.sid}")
-                sentences = twilio_client.intelligence.v2.transcripts(conversation_transcript.sid).sentences.list(limit=1000)
+                if isinstance(sentences, Exception):
+                    raise sentences
                 
                 log_debug(f"[INTEL] Raw sentences API response: {len(sentences)} sentences found")
                 
                 transcript_sentences = []
                 for sentence in sentences:
-                    # Debug: Check what attributes are actually available
-                    sentence_attrs = [attr for attr in dir(sentence) if not attr.startswith('_')]
-                    log_debug(f"[INTEL] Sentence attributes: {sentence_attrs[:10]}...")  # Show first 10 attrs
-                    
                     # Map media channel to speaker label
                     media_channel = getattr(sentence, 'media_channel', None)
                     speaker_label = 'unknown'
@@ -459,7 +586,8 @@ async def get_conversation_intelligence(request):
                             sentence_data["date_created"] = str(sentence_data["date_created"])
                     
                     transcript_sentences.append(sentence_data)
-                    log_debug(f"[INTEL] Processed sentence: {sentence_data['text'][:50] if sentence_data['text'] else 'No text'}...")
+                    if DEBUG_MODE:
+                        log_debug(f"[INTEL] Processed sentence: {sentence_data['text'][:50] if sentence_data['text'] else 'No text'}...")
                 
                 log_debug(f"[INTEL] ✅ Successfully processed {len(transcript_sentences)} transcript sentences")
                     
@@ -469,16 +597,14 @@ async def get_conversation_intelligence(request):
             
             # Get operator results
             try:
-                log_debug(f"[INTEL] Fetching operator results for transcript: {conversation_transcript.sid}")
-                ops = twilio_client.intelligence.v2.transcripts(conversation_transcript.sid).operator_results.list()
+                if isinstance(ops, Exception):
+                    raise ops
                 
                 log_debug(f"[INTEL] Raw operator results API response: {len(ops)} results found")
                 
                 for i, op in enumerate(ops):
-                    # Debug: Check what attributes are actually available
-                    op_attrs = [attr for attr in dir(op) if not attr.startswith('_')]
-                    log_debug(f"[INTEL] Processing operator result {i+1}/{len(ops)}")
-                    log_debug(f"[INTEL] Operator attributes: {op_attrs[:15]}...")  # Show first 15 attrs
+                    if DEBUG_MODE:
+                        log_debug(f"[INTEL] Processing operator result {i+1}/{len(ops)}")
                     
                     result_data = {
                         "sid": getattr(op, 'operator_sid', None),  # From CLI: operatorSid
@@ -501,35 +627,17 @@ async def get_conversation_intelligence(request):
                         except:
                             result_data["date_created"] = str(result_data["date_created"])
                     
-                    log_debug(f"[INTEL] Processing {result_data['name']} ({result_data['operator_type']})")
+                    if DEBUG_MODE:
+                        log_debug(f"[INTEL] Processing {result_data['name']} ({result_data['operator_type']})")
                     
                     # Parse results by operator type
-                    if op.operator_type == "text-generation":
-                        # For CSAT, CES, Agent Effectiveness, etc.
-                        if hasattr(op, 'text_generation_results') and op.text_generation_results:
-                            result_data["text_result"] = getattr(op.text_generation_results, 'result', None)
-                            log_debug(f"[INTEL] Text generation result: {result_data['text_result'][:100] if result_data['text_result'] else 'None'}...")
-                        else:
-                            # Fallback to check for direct text result
-                            result_data["text_result"] = getattr(op, 'text_result', None)
-                    
-                    elif op.operator_type == "conversation-classify":
-                        # For sentiment analysis
-                        result_data["predicted_label"] = getattr(op, 'predicted_label', None)
-                        result_data["predicted_probability"] = getattr(op, 'predicted_probability', None)
-                        result_data["label_probabilities"] = getattr(op, 'label_probabilities', {})
-                        log_debug(f"[INTEL] Sentiment analysis: {result_data['predicted_label']} ({result_data['predicted_probability']})")
-                    
-                    elif op.operator_type == "extract":
-                        # For entity extraction
-                        result_data["extract_results"] = getattr(op, 'extract_results', {})
-                        result_data["match_probability"] = getattr(op, 'match_probability', None)
-                        result_data["extract_match"] = getattr(op, 'extract_match', None)
-                        result_data["utterance_results"] = getattr(op, 'utterance_results', [])
-                        log_debug(f"[INTEL] Entity extraction: {len(result_data['utterance_results'])} utterances")
+                    parser = OPERATOR_DETAIL_PARSERS.get(result_data["operator_type"])
+                    if parser:
+                        result_data.update(parser(op))
                     
                     operator_results.append(result_data)
-                    log_debug(f"[INTEL] ✅ Added operator result: {op.name}")
+                    if DEBUG_MODE:
+                        log_debug(f"[INTEL] ✅ Added operator result: {op.name}")
                 
                 log_debug(f"[INTEL] ✅ Successfully processed {len(operator_results)} operator results")
                 
@@ -568,7 +676,7 @@ async def test_transcripts(request):
         intelligence_service_sid = os.getenv("TWILIO_INTELLIGENCE_SERVICE_SID", "GA283e1ef3f15a071f01a91a96a4c16621")
         
         # Test: List transcripts using correct Intelligence API access
-        transcripts = twilio_client.intelligence.v2.transcripts.list(limit=10)
+        transcripts = await asyncio.to_thread(twilio_client.intelligence.v2.transcripts.list, limit=10)
         
         result = {
             "service_sid": intelligence_service_sid,
@@ -604,12 +712,51 @@ async def test_transcripts(request):
 
 if NDJSON_FILE.exists():
     try:
-        df = pd.read_json(NDJSON_FILE, lines=True)
-        for _, row in df.iterrows():
-            intel_log.append(row.to_dict())
+        with open(NDJSON_FILE, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    continue  # Partially written line from an interrupted run
+                intel_log.append(record)
+                if record.get("transcript_sid"):
+                    known_sids.add(str(record["transcript_sid"]))
+                aggregate_intel_result(record)
     except Exception as e:
         log_debug(f"[WARN] Failed to preload past results: {e}")
 
+def read_knowledge_file(path):
+    """Raw bytes of a knowledge file, or None if unreadable; Agent.load_knowledge decodes them once"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except Exception as e:
+        log_debug(f"[WARN] Could not load knowledge from {path}: {e}")
+        return None
+
+def read_tool_file(path):
+    """Parsed JSON tool definition, the file name for other tool files, or None if missing/unreadable"""
+    if not Path(path).exists():
+        return None
+    try:
+        if path.endswith('.json'):
+            with open(path, 'rb') as f:
+                return orjson.loads(f.read())
+        return Path(path).name
+    except Exception as e:
+        log_debug(f"[WARN] Could not load tool file {path}: {e}")
+        return None
+
+# Agent-specific personalities used at the top of each agent's system context
+AGENT_PERSONALITIES = {
+    "Olli": "You are Olli, the friendly generalist at Owl Bank. You help with general questions and route customers to specialists when needed.",
+    "Sunny": "You are Sunny, the welcoming onboarding specialist at Owl Bank. You help new customers get started and explain our services.",
+    "Max": "You are Max, the wealth management specialist at Owl Bank. You serve high-net-worth clients with sophisticated financial needs.",
+    "Io": "You are Io, the investment specialist at Owl Bank. You help customers with investment options, portfolio advice, and financial planning."
+}
+
 class Agent:
     def __init__(self, name, role, knowledge_paths=None, tools_paths=None, logger=None):
         self.name = name
@@ -618,31 +765,72 @@ class Agent:
         self.tools_paths = tools_paths or []
         self.knowledge = ""
         self.tools = []
+        self.routing_instruction = ""
+        self.build_context = None
         self.logger = logger or logging.getLogger(__name__)
 
 
-    def load_knowledge(self):
+    def load_knowledge(self, preloaded: dict = None):
         contents = []
         for path in self.knowledge_paths:
-            try:
-                with open(path, 'r', encoding='utf-8') as f:
-                    contents.append(f.read())
-            except Exception as e:
-                log_debug(f"[WARN] Could not load knowledge from {path}: {e}")
-        self.knowledge = "\n".join(contents)
+            if preloaded is not None and path in preloaded:
+                raw = preloaded[path]
+            else:
+                raw = read_knowledge_file(path)
+            if raw is not None:
+                contents.append(raw)
+        self.knowledge = b"\n".join(contents).decode('utf-8', errors='replace')
 
-    def load_tools(self):
+    def load_tools(self, preloaded: dict = None):
         for path in self.tools_paths:
-            if Path(path).exists():
-                try:
-                    with open(path, 'r', encoding='utf-8') as f:
-                        if path.endswith('.json'):
-                            tool_data = json.load(f)
-                            self.tools.append(tool_data)
-                        else:
-                            self.tools.append(Path(path).name)
-                except Exception as e:
-                    log_debug(f"[WARN] Could not load tool file {path}: {e}")
+            if preloaded is not None and path in preloaded:
+                tool = preloaded[path]
+            else:
+                tool = read_tool_file(path)
+            if tool is not None:
+                self.tools.append(tool)
+        self.routing_instruction = self.build_routing_instruction()
+
+    def build_routing_instruction(self):
+        """Render the specialist routing rules from the loaded tools (done once at load time)"""
+        instruction = ""
+        for tool in self.tools:
+            if isinstance(tool, dict) and "agents" in tool:
+                routes = tool["agents"]
+                formatted = "\n".join(
+                    f"- If the customer mentions: {', '.join(a['triggers'])}, route to {a['agent']} (role: {a['role']})"
+                    for a in routes
+                )
+                instruction = f"\n\nIf any of the following topics arise, route accordingly:\n{formatted}"
+        return instruction
+
+    def compile_context(self):
+        """Bake everything static about this agent into a context builder that only takes the personalization section"""
+        agent_personality = AGENT_PERSONALITIES.get(self.name, f"You are {self.name}, a {self.role} support agent at Owl Bank.")
+
+        # Specialist routing logic for Olli
+        extra_instruction = self.routing_instruction if self.name == "Olli" else ""
+
+        prefix = (
+            f"{agent_personality}\n"
+            f"IMPORTANT: Always identify yourself correctly as {self.name}. Never claim to be a different agent.\n"
+            f"Behavioral rules (critical):\n"
+            f"- Never read out long lists of products or recommendations. Ask discovery questions first to narrow options.\n"
+            f"- Ask ONE question at a time and wait for the customer's reply.\n"
+            f"- Before a multistep task, ask: do they prefer step-by-step with confirmation at each step, or a summary of all steps? Default to step-by-step.\n"
+            f"- Confirm understanding and get consent before moving to the next step.\n"
+            f"- Keep utterances concise and optimized for TTS; avoid emojis and special characters.\n"
+            f"Use the following knowledge base:\n{self.knowledge}"
+        )
+        suffix = (
+            f"\nYou have access to the following tools and escalation rules: {extra_instruction}\n"
+            f"If needed, append your message with #route_to:<AgentName>."
+        )
+
+        def build_context(personalization: str = "") -> str:
+            return prefix + personalization + suffix
+
+        self.build_context = build_context
 
 class AgentRegistry:
     def __init__(self):
@@ -651,8 +839,25 @@ class AgentRegistry:
     def register(self, agent: Agent):
         agent.load_knowledge()
         agent.load_tools()
+        agent.compile_context()
         self.agents[agent.name] = agent
 
+    def register_all(self, agents: list):
+        """Register several agents, reading all their knowledge and tool files once each, in parallel"""
+        paths = list({path for agent in agents for path in agent.knowledge_paths})
+        tool_paths = list({path for agent in agents for path in agent.tools_paths})
+        with ThreadPoolExecutor(max_workers=min(8, len(paths) + len(tool_paths) or 1)) as executor:
+            # map() submits every read up front, so knowledge and tool files load concurrently
+            knowledge = executor.map(read_knowledge_file, paths)
+            tools = executor.map(read_tool_file, tool_paths)
+            preloaded = dict(zip(paths, knowledge))
+            preloaded_tools = dict(zip(tool_paths, tools))
+        for agent in agents:
+            agent.load_knowledge(preloaded)
+            agent.load_tools(preloaded_tools)
+            agent.compile_context()
+            self.agents[agent.name] = agent
+
     def get_agent(self, name):
         return self.agents.get(name)
 
@@ -666,128 +871,173 @@ class AgentRegistry:
 # Initialize agents
 registry = AgentRegistry()
 
-registry.register(Agent(
-    name="Olli",
-    role="generalist",
-    knowledge_paths=["./knowledge/owlbank_olli_faqs.txt", "./knowledge/owlbank_specialist_agents.csv"],
-    tools_paths=["./tools/route-to-specialist.json"],
-    logger=logger
-))
-
-registry.register(Agent(
-    name="Sunny",
-    role="onboarding",
-    knowledge_paths=["./knowledge/owlbank_onboarding.txt"],
-    tools_paths=["./tools/route-to-generalist.json"],
-    logger=logger
-))
-
-registry.register(Agent(
-    name="Max",
-    role="wealth",
-    knowledge_paths=["./knowledge/high-value-customer.csv", "./knowledge/owlbank_wealth-management.txt"],
-    tools_paths=["./tools/route-to-generalist.json"],
-    logger=logger
-))
-
-registry.register(Agent(
-    name="Io",
-    role="investments",
-    knowledge_paths=["./knowledge/owlbank_investment_products.txt", "./knowledge/owlbank_investors-and-assets.csv"],
-    tools_paths=["./tools/route-to-generalist.json"],
-    logger=logger
-))
+registry.register_all([
+    Agent(
+        name="Olli",
+        role="generalist",
+        knowledge_paths=["./knowledge/owlbank_olli_faqs.txt", "./knowledge/owlbank_specialist_agents.csv"],
+        tools_paths=["./tools/route-to-specialist.json"],
+        logger=logger
+    ),
+    Agent(
+        name="Sunny",
+        role="onboarding",
+        knowledge_paths=["./knowledge/owlbank_onboarding.txt"],
+        tools_paths=["./tools/route-to-generalist.json"],
+        logger=logger
+    ),
+    Agent(
+        name="Max",
+        role="wealth",
+        knowledge_paths=["./knowledge/high-value-customer.csv", "./knowledge/owlbank_wealth-management.txt"],
+        tools_paths=["./tools/route-to-generalist.json"],
+        logger=logger
+    ),
+    Agent(
+        name="Io",
+        role="investments",
+        knowledge_paths=["./knowledge/owlbank_investment_products.txt", "./knowledge/owlbank_investors-and-assets.csv"],
+        tools_paths=["./tools/route-to-generalist.json"],
+        logger=logger
+    )
+])
+
+# Customer traits included in the agent context, with their prompt labels
+PERSONALIZATION_TRAITS = (
+    ("first_name", "Name"),
+    ("company", "Company"),
+    ("email", "Email"),
+    ("current_stage", "Stage"),
+    ("event", "Context"),
+    ("flex_last-interaction-outcome", "Last Outcome"),
+)
+
+def profile_cache_key(customer_profile: dict = None) -> tuple:
+    """Flatten the relevant customer traits to hashable (label, value) pairs for caching"""
+    if customer_profile and "traits" in customer_profile:
+        traits = customer_profile["traits"]
+        return tuple((label, str(traits[key])) for key, label in PERSONALIZATION_TRAITS if key in traits)
+    return ()
 
 def build_agent_context(agent_name: str, customer_profile: dict = None):
+    return _render_agent_context(agent_name, profile_cache_key(customer_profile))
+
+
+@functools.lru_cache(maxsize=4096)
+def _render_agent_context(agent_name: str, traits_key: tuple = ()):
     agent = registry.get_agent(agent_name)
     if not agent:
         raise ValueError(f"Agent '{agent_name}' not found in registry")
 
     # Build personalization section
     personalization = ""
-    if customer_profile and "traits" in customer_profile:
-        traits = customer_profile["traits"]
-        items = []
-        if "first_name" in traits:
-            items.append(f"- Name: {traits['first_name']}")
-        if "company" in traits:
-            items.append(f"- Company: {traits['company']}")
-        if "email" in traits:
-            items.append(f"- Email: {traits['email']}")
-        if "current_stage" in traits:
-            items.append(f"- Stage: {traits['current_stage']}")
-        if "event" in traits:
-            items.append(f"- Context: {traits['event']}")
-        if "flex_last-interaction-outcome" in traits:
-            items.append(f"- Last Outcome: {traits['flex_last-interaction-outcome']}")
-        if items:
-            personalization = "\n\nCustomer info:\n" + "\n".join(items)
-
-    # Specialist routing logic for Olli
-    extra_instruction = ""
-    if agent.name == "Olli":
-        for tool in agent.tools:
-            if isinstance(tool, dict) and "agents" in tool:
-                routes = tool["agents"]
-                formatted = "\n".join(
-                    f"- If the customer mentions: {', '.join(a['triggers'])}, route to {a['agent']} (role: {a['role']})"
-                    for a in routes
-                )
-                extra_instruction = f"\n\nIf any of the following topics arise, route accordingly:\n{formatted}"
-
-    # Build agent-specific personality
-    personality_map = {
-        "Olli": "You are Olli, the friendly generalist at Owl Bank. You help with general questions and route customers to specialists when needed.",
-        "Sunny": "You are Sunny, the welcoming onboarding specialist at Owl Bank. You help new customers get started and explain our services.",
-        "Max": "You are Max, the wealth management specialist at Owl Bank. You serve high-net-worth clients with sophisticated financial needs.",
-        "Io": "You are Io, the investment specialist at Owl Bank. You help customers with investment options, portfolio advice, and financial planning."
-    }
-    
-    agent_personality = personality_map.get(agent.name, f"You are {agent.name}, a {agent.role} support agent at Owl Bank.")
-    
+    if traits_key:
+        personalization = "\n\nCustomer info:\n" + "\n".join(f"- {label}: {value}" for label, value in traits_key)
+
+    return agent.build_context(personalization)
+
+
+def build_system_prompt(agent_name: str, language: str, customer_profile: dict = None, mode: str = "history"):
+    """System prompt for the voice LLM; mode is "text" for single prompts or "history" for chat history"""
+    return _render_system_prompt(agent_name, language, profile_cache_key(customer_profile), mode)
+
+
+@functools.lru_cache(maxsize=256)
+def _render_system_prompt(agent_name: str, language: str, traits_key: tuple, mode: str):
+    context = _render_agent_context(agent_name, traits_key)
+    if mode == "text":
+        language_instruction = f"Speak in {language}. But respect user's request if they ask to switch language.\n"
+    else:
+        language_instruction = f"Speak in {language}, but you can switch languages if needed to English and Latin American Spanish."
     return (
-        f"{agent_personality}\n"
-        f"IMPORTANT: Always identify yourself correctly as {agent.name}. Never claim to be a different agent.\n"
-        f"Behavioral rules (critical):\n"
-        f"- Never read out long lists of products or recommendations. Ask discovery questions first to narrow options.\n"
-        f"- Ask ONE question at a time and wait for the customer's reply.\n"
-        f"- Before a multistep task, ask: do they prefer step-by-step with confirmation at each step, or a summary of all steps? Default to step-by-step.\n"
-        f"- Confirm understanding and get consent before moving to the next step.\n"
-        f"- Keep utterances concise and optimized for TTS; avoid emojis and special characters.\n"
-        f"Use the following knowledge base:\n{agent.knowledge}"
-        f"{personalization}"
-        f"\nYou have access to the following tools and escalation rules: {extra_instruction}\n"
-        f"If needed, append your message with #route_to:<AgentName>."
+        f"{context}\n\n"
+        f"You are talking to a customer through a phone call. "
+        f"{language_instruction}"
+        f"Respond conversationally. Avoid special characters or emojis. Optimize responses for speech to text.\n"
+        f"IMPORTANT: If you need to route to a specialist agent (Sunny, Max, or Io), "
+        f"provide a helpful response first, then add #route_to:<AgentName> at the very end. "
+        f"The routing command #route_to:<AgentName> will NOT be spoken to the customer. "
+        f"For example: 'Let me connect you with our wealth management expert. #route_to:Max'"
     )
 
 
 
+LANGUAGE_SWITCH_PATTERNS = {
+    "pt-BR": [
+        r"(?:speak|talk|switch|change).*(?:portuguese|português)",
+        r"(?:falar|fala).*(?:português|portuguese)"
+    ],
+    "en-US": [
+        r"(?:speak|talk|switch|change).*(?:english|inglês)",
+        r"(?:falar|fala).*(?:inglês|english)"
+    ],
+    "es-US": [
+        r"(?:speak|talk|switch|change).*(?:spanish|espanhol|español)",
+        r"(?:hablar|habla|falar|fala|cambiar).*(?:espanhol|español|spanish)"
+    ]
+}
+
+# All patterns fused into one alternation with a named group per language, so each utterance
+# is scanned once. detect_language_switch lowercases the text (the trigger prefilter needs that
+# anyway) and the patterns are lowercase, so the regex can match case-sensitively.
+_LANG_GROUPS = {lang_code.replace("-", ""): lang_code for lang_code in LANGUAGE_SWITCH_PATTERNS}
+_LANG_SWITCH_SOURCE = "|".join(
+    f"(?P<{lang_code.replace('-', '')}>{'|'.join(patterns)})"
+    for lang_code, patterns in LANGUAGE_SWITCH_PATTERNS.items()
+)
+try:
+    # google-re2 matches with a DFA in linear time, same syntax and leftmost-first semantics as re
+    import re2
+    _LANG_SWITCH_RX = re2.compile(_LANG_SWITCH_SOURCE)
+except Exception:
+    _LANG_SWITCH_RX = re.compile(_LANG_SWITCH_SOURCE)
+
+# Every pattern starts with one of these verbs; utterances without them can't be a switch request
+_LANG_SWITCH_TRIGGERS = ("speak", "talk", "switch", "change", "fala", "habla", "cambiar")
+
 def detect_language_switch(text: str, current_lang: str = "pt-BR") -> str:
     text = text.lower()
-    language_patterns = {
-        "pt-BR": [
-            r"(speak|talk|switch|change).*(portuguese|português)",
-            r"(falar|fala).*(português|portuguese)"
-        ],
-        "en-US": [
-            r"(speak|talk|switch|change).*(english|inglês)",
-            r"(falar|fala).*(inglês|english)"
-        ],
-        "es-US": [
-            r"(speak|talk|switch|change).*(spanish|espanhol|español)",
-            r"(hablar|habla|falar|fala|cambiar).*(espanhol|español|spanish)"
-        ]
-    }
-    for lang_code, patterns in language_patterns.items():
-        for pattern in patterns:
-            if re.search(pattern, text):
-                return lang_code
+    if not any(trigger in text for trigger in _LANG_SWITCH_TRIGGERS):
+        return current_lang
+    match = _LANG_SWITCH_RX.search(text)
+    if match:
+        return _LANG_GROUPS[match.lastgroup]
     return current_lang
 
+# Routing tag the model appends at the very end of a reply; detected while the reply streams
+ROUTE_PREFIX = "#route_to:"
+_ROUTE_RX = re.compile(r"#route_to:(\w+)")
+_ROUTE_DONE_RX = re.compile(r"#route_to:(\w+)\W")  # Agent name terminated mid-stream
+
+# Canned (banking) replies are sent to TTS one sentence at a time
+_SENTENCE_SPLIT_RX = re.compile(r"(?<=[.!?])\s+")
+
+
+# response.create frames split around the say text, matching json.dumps(payload, ensure_ascii=True)
+_RELAY_SAY_PREFIX = '{"type": "response.create", "response": {"instructions": [{"type": "say", "text": '
+
+@functools.lru_cache(maxsize=32)
+def relay_say_suffix(language: str, barge_in: bool, last: bool) -> str:
+    return (f', "language": {json.dumps(language)}}}], "bargeIn": {json.dumps(barge_in)}}}, '
+            f'"last": {json.dumps(last)}}}')
+
+
+# Legacy "text" token frames, split around the token the same way
+_TEXT_TOKEN_PREFIX = '{"type": "text", "token": '
+
+@functools.lru_cache(maxsize=32)
+def text_token_suffix(last: bool, interruptible: bool, preemptible: bool, language: str) -> str:
+    suffix = (f', "last": {json.dumps(last)}, "interruptible": {json.dumps(interruptible)}, '
+              f'"preemptible": {json.dumps(preemptible)}')
+    if language:
+        suffix += f', "lang": {json.dumps(language)}'
+    return suffix + "}"
+
 
 @dataclass
 class ConversationConfig:
-    sentence_end_patterns = ['.', '!', '?', '\n']
+    sentence_end_patterns = frozenset('.!?\n')  # Single characters, checked with isdisjoint per token
+    flush_threshold = 120  # Max pending characters before a TTS flush without a sentence end
     partial_timeout = 1.5
     max_buffer_size = 1000
     openai_model = os.getenv('OPENAI_MODEL', 'gpt-5-mini')  # Default to gpt-5-mini if not set
@@ -801,11 +1051,11 @@ import asyncio
 class LLMClient:
     def __init__(self, config: ConversationConfig):
         self.config = config
-        logger.info(f"{Fore.CYAN}[DEBUG] About to create OpenAI() client in LLMClient{Style.RESET_ALL}")
+        logger.info(f"{Fore.CYAN}[DEBUG] About to create AsyncOpenAI() client in LLMClient{Style.RESET_ALL}")
         
         try:
             # Create OpenAI client - httpx==0.27.2 fixes the proxies compatibility issue
-            self.client = OpenAI()
+            self.client = AsyncOpenAI()
             logger.info(f"{Fore.GREEN}[DEBUG] OpenAI client created successfully in LLMClient{Style.RESET_ALL}")
         except Exception as e:
             logger.error(f"{Fore.RED}[ERR] Failed to create OpenAI client in LLMClient: {e}{Style.RESET_ALL}")
@@ -820,34 +1070,19 @@ class LLMClient:
         pass
 
     async def get_completion(self, text: str, language: str, agent_name: str = "Olli", customer_profile: dict = None):
-        context = build_agent_context(agent_name, customer_profile)
+        system_prompt = build_system_prompt(agent_name, language, customer_profile, "text")
         messages = [
-            {
-                "role": "system",
-                "content": (
-                    f"{context}\n\n"
-                    f"You are talking to a customer through a phone call. "
-                    f"Speak in {language}. But respect user's request if they ask to switch language.\n"
-                    f"Respond conversationally. Avoid special characters or emojis. Optimize responses for speech to text.\n"
-                    f"IMPORTANT: If you need to route to a specialist agent (Sunny, Max, or Io), "
-                    f"provide a helpful response first, then add #route_to:<AgentName> at the very end. "
-                    f"The routing command #route_to:<AgentName> will NOT be spoken to the customer. "
-                    f"For example: 'Let me connect you with our wealth management expert. #route_to:Max'"
-                )
-            },
+            {"role": "system", "content": system_prompt},
             {"role": "user", "content": text}
         ]
 
-        def sync_stream():
-            return self.client.chat.completions.create(
+        try:
+            stream = await self.client.chat.completions.create(
                 model=self.config.openai_model,
                 messages=messages,
                 stream=True
             )
-
-        try:
-            stream = await asyncio.to_thread(sync_stream)
-            for chunk in stream:
+            async for chunk in stream:
                 content = chunk.choices[0].delta.content
                 if content:
                     yield content
@@ -855,49 +1090,39 @@ class LLMClient:
             logger.error(f"{Fore.RED}[ERR] Streaming LLM error: {e}{Style.RESET_ALL}\n")
             yield "Desculpe, ocorreu um erro."
 
-    async def get_completion_from_history(self, history: list, language: str, agent_name: str = "Olli", customer_profile: dict = None):
-        context = build_agent_context(agent_name, customer_profile)
-        messages = [
-            {"role": "system", "content": (
-                f"{context}\n\n"
-                f"You are talking to a customer through a phone call. "
-                f"Speak in {language}, but you can switch languages if needed to English and Latin American Spanish."
-                f"Respond conversationally. Avoid special characters or emojis. Optimize responses for speech to text.\n"
-                f"IMPORTANT: If you need to route to a specialist agent (Sunny, Max, or Io), "
-                f"provide a helpful response first, then add #route_to:<AgentName> at the very end. "
-                f"The routing command #route_to:<AgentName> will NOT be spoken to the customer. "
-                f"For example: 'Let me connect you with our wealth management expert. #route_to:Max'"
-            )}
-        ] + history
+    async def get_completion_from_history(self, history: list, language: str, agent_name: str = "Olli", customer_profile: dict = None, system_message: dict = None):
+        if system_message is None:
+            system_message = {"role": "system", "content": build_system_prompt(agent_name, language, customer_profile, "history")}
+        messages = [system_message] + history
 
+        stream = None
         try:
-            # Create stream in thread to avoid blocking event loop
-            stream = await asyncio.to_thread(
-                lambda: self.client.chat.completions.create(
-                    model=self.config.openai_model,
-                    messages=messages,
-                    stream=True
-                )
+            stream = await self.client.chat.completions.create(
+                model=self.config.openai_model,
+                messages=messages,
+                stream=True
             )
-            
-            # Iterate chunks in thread to keep event loop responsive for Railway pings
-            def get_next_chunk():
-                try:
-                    return next(stream)
-                except StopIteration:
-                    return None
-            
-            while True:
-                chunk = await asyncio.to_thread(get_next_chunk)
-                if chunk is None:
-                    break
+            async for chunk in stream:
                 content = chunk.choices[0].delta.content
                 if content:
                     yield content
+        except (asyncio.CancelledError, GeneratorExit):
+            # Speculative stream invalidated or caller stopped early - stop pulling from OpenAI
+            if stream is not None:
+                await stream.close()
+            raise
         except Exception as e:
             logger.error(f"{Fore.RED}[ERR] Streaming LLM error: {e}{Style.RESET_ALL}\n")
             yield "Desculpe, ocorreu um erro."
 
+# Per-client cap on a dashboard send so a stalled browser can't hold up a broadcast
+DASHBOARD_SEND_TIMEOUT = float(os.getenv("DASHBOARD_SEND_TIMEOUT", "0.5"))
+DASHBOARD_QUEUE_MAX = int(os.getenv("DASHBOARD_QUEUE_MAX", "1024"))
+# Ask Conversation Relay for partial prompts and start the LLM on them before the turn ends
+SPECULATIVE_LLM = os.getenv("SPECULATIVE_LLM", "false").lower() in ['true', '1', 'yes']
+# User/assistant turns kept in chat_history and resent to the LLM on every completion
+CHAT_HISTORY_MAX_TURNS = int(os.getenv("CHAT_HISTORY_MAX_TURNS", "20"))
+
 class TwilioWebSocketHandler:
     def __init__(self):
         self.config = ConversationConfig()
@@ -908,33 +1133,59 @@ class TwilioWebSocketHandler:
         # Always use standard LLM client (OpenAI Functions disabled)
         logger.info(f"{Fore.CYAN}[DEBUG] Creating standard LLMClient instance{Style.RESET_ALL}")
         self.llm_client = LLMClient(self.config)
-        logger.info(f"{Fore.BLUE}[SYS] Standard LLM Client initialized successfully{Style.RESET_ALL}")
+        logger.info(f"{_SYS}Standard LLM Client initialized successfully{_RST}")
         self.websocket = None
         self.conversation_sid = None
-        self.latest_prompt_flags = {
-            "interruptible": False,
-            "preemptible": False,
-            "last": True
-        }
-        self.dashboard_clients = set()
+        # Flags from the latest prompt, used for TTS sends; updated only in handle_prompt
+        self._interruptible = False
+        self._preemptible = False
+        self.dashboard_clients = []  # Dashboard sockets; closed ones are swept on broadcast
+        self._dash_q = asyncio.Queue(maxsize=DASHBOARD_QUEUE_MAX)  # Pending dashboard events
+        self._dash_task = None  # Started on the first broadcast
         self.language = 'pt-BR'  # default
         self.active_agent = "Olli"  # Default agent, will be updated in setup based on channel
-        self.chat_history = []  # Stores full chat context
+        self.chat_history = []  # Recent chat context, trimmed to CHAT_HISTORY_MAX_TURNS after each turn
+        self._turn = 0  # Completed turns; part of the speculation key since the trimmed history length plateaus
+        self._system_cache = {}  # System messages by (agent, language, profile key); cleared on agent/language switch
+        self._profile_key = ()  # profile_cache_key(self.personalization), computed once at setup
         # Initialize banking tools and conversations logger (standard version only)
         self.banking_tools = get_banking_tools()
         self.conversations_logger = get_conversations_logger()
+        # ConversationsLogger does blocking HTTP posts; one worker keeps them off the loop and in order
+        self._conv_log_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="conv-log")
         self.customer_phone = None  # Store customer phone for banking operations
         self.live_transcription_active = False  # Track if live transcription is active
         self.current_partial_transcript = {}  # Store partial transcripts by speaker
         
         # WebSocket resilience features
         self.response_buffer = []  # Buffer responses during connection issues
+        self._pending_tokens = []  # LLM tokens not yet sent to TTS
+        self._pending_len = 0
+        self._pending_sent = False  # Whether part of the current response was already flushed
+        self._held_chunk = None  # Last flushed chunk, sent once more speech follows so the final one carries last=true
+        self._route_tail = ""  # Held-back text that may be a #route_to tag
+        self._spoken_parts = []  # Chunks sent to TTS for the current response
+        self._spec_task = None  # LLM stream started on a partial prompt
+        self._spec_key = None  # (prompt, agent, language, history length) the speculation was built for
+        self._spec_queue = None
         self.connection_health = True  # Track connection health
         self.last_heartbeat = None  # Track last successful communication
         self.connection_retry_count = 0  # Track retry attempts
         self._keepalive_task = None  # Keep-alive background task
         self._keepalive_running = False  # Keep-alive state flag
 
+        # Conversation Relay event type -> handler(data, ts)
+        self._handlers = {
+            "setup": self.handle_setup,
+            "prompt": self.handle_prompt,
+            "interrupt": self.handle_interrupt,
+            "dtmf": self.handle_dtmf,
+            "info": functools.partial(self.handle_info_debug, "info"),
+            "debug": functools.partial(self.handle_info_debug, "debug"),
+            "error": self.handle_relay_error,
+            "close": self.handle_relay_close,
+        }
+
     def _get_keepalive_interval(self) -> int:
         """Get keep-alive interval based on deployment environment"""
         deployment_env = self._detect_environment()
@@ -991,13 +1242,50 @@ class TwilioWebSocketHandler:
                 pass
             self._keepalive_task = None
 
-    async def broadcast_to_dashboard(self, payload: dict):
-        msg = json.dumps(payload)
-        for ws in self.dashboard_clients:
+    async def broadcast_to_dashboard(self, payload: Union[dict, str]):
+        """Queue a dashboard event; the pump task does the fan-out off the voice path.
+        A str payload is taken as already-serialized JSON and sent as is."""
+        if not self.dashboard_clients:
+            return
+        if self._dash_task is None or self._dash_task.done():
+            self._dash_task = asyncio.create_task(self._dash_pump())
+        if self._dash_q.full():
+            # Drop the oldest event rather than stall the caller
+            self._dash_q.get_nowait()
+            self._dash_q.task_done()
+        self._dash_q.put_nowait(payload)
+
+    async def _dash_pump(self):
+        while True:
+            payload = await self._dash_q.get()
             try:
-                await ws.send_str(msg)
+                await self._send_to_dashboards(payload)
             except Exception as e:
-                logger.error(f"{Fore.RED}[ERR] Dashboard WS send failed: {e}{Style.RESET_ALL}\n")
+                logger.error(f"{_ERR}Dashboard broadcast failed: {e}{_RST}\n")
+            finally:
+                self._dash_q.task_done()
+
+    async def _send_to_dashboards(self, payload: Union[dict, str]):
+        clients = [ws for ws in self.dashboard_clients if not ws.closed]
+        if len(clients) != len(self.dashboard_clients):
+            self.dashboard_clients = clients
+        if not clients:
+            return
+        msg = payload if isinstance(payload, str) else orjson.dumps(payload, default=safe_json).decode()
+        # Send to every client concurrently so one slow dashboard doesn't hold up the rest
+        results = await asyncio.gather(
+            *(asyncio.wait_for(ws.send_str(msg), DASHBOARD_SEND_TIMEOUT) for ws in clients),
+            return_exceptions=True
+        )
+        failed = []
+        for ws, result in zip(clients, results):
+            if isinstance(result, Exception):
+                logger.error(f"{_ERR}Dashboard WS send failed: {type(result).__name__}: {result}{_RST}\n")
+                # A timeout only means the client is slow; any other error means the socket is gone
+                if not isinstance(result, asyncio.TimeoutError):
+                    failed.append(ws)
+        if failed:
+            self.dashboard_clients = [ws for ws in self.dashboard_clients if ws not in failed]
 
     def update_transcription_state(self, event_type: str, data: dict):
         """Update the live transcription state based on incoming events"""
@@ -1026,10 +1314,10 @@ class TwilioWebSocketHandler:
     async def handle_websocket(self, request):
         # Environment-specific WebSocket handling
         deployment_env = self._detect_environment()
-        logger.info(f"{Fore.CYAN}[WS] WebSocket connection request from {request.remote}{Style.RESET_ALL}")
-        logger.info(f"{Fore.CYAN}[WS] User-Agent: {request.headers.get('User-Agent', 'Unknown')}{Style.RESET_ALL}")
-        logger.info(f"{Fore.CYAN}[WS] Origin: {request.headers.get('Origin', 'Unknown')}{Style.RESET_ALL}")
-        logger.info(f"{Fore.CYAN}[WS] Environment: {deployment_env}{Style.RESET_ALL}")
+        logger.info(f"{_WS}WebSocket connection request from {request.remote}{_RST}")
+        logger.info(f"{_WS}User-Agent: {request.headers.get('User-Agent', 'Unknown')}{_RST}")
+        logger.info(f"{_WS}Origin: {request.headers.get('Origin', 'Unknown')}{_RST}")
+        logger.info(f"{_WS}Environment: {deployment_env}{_RST}")
         
         # Environment-specific WebSocket settings
         ws_config = {
@@ -1070,10 +1358,10 @@ class TwilioWebSocketHandler:
         self.connection_retry_count = 0
         self.response_buffer = []  # Reset buffer on new connection
         
-        logger.info(f"{Fore.BLUE}[SYS] New WebSocket connection established{Style.RESET_ALL}")
-        logger.info(f"{Fore.CYAN}[WS] Handler ID: {id(self)}, WebSocket prepared successfully{Style.RESET_ALL}")
-        logger.info(f"{Fore.CYAN}[WS] Connection from: {request.remote}, User-Agent: {request.headers.get('User-Agent', 'Unknown')}{Style.RESET_ALL}")
-        logger.info(f"{Fore.CYAN}[WS] Connection details: env={deployment_env}, heartbeat={config['heartbeat']}s, compress={config['compress']}, timeout={config['timeout']}s{Style.RESET_ALL}\n")
+        logger.info(f"{_SYS}New WebSocket connection established{_RST}")
+        logger.info(f"{_WS}Handler ID: {id(self)}, WebSocket prepared successfully{_RST}")
+        logger.info(f"{_WS}Connection from: {request.remote}, User-Agent: {request.headers.get('User-Agent', 'Unknown')}{_RST}")
+        logger.info(f"{_WS}Connection details: env={deployment_env}, heartbeat={config['heartbeat']}s, compress={config['compress']}, timeout={config['timeout']}s{_RST}\n")
 
         # Start keep-alive immediately to prevent infrastructure timeout
         self._keepalive_task = asyncio.create_task(self._start_keepalive())
@@ -1089,93 +1377,84 @@ class TwilioWebSocketHandler:
                     logger.info(f"{Fore.GREEN}[WS] Received message: {len(msg.data)} bytes{Style.RESET_ALL}")
                     await self.route_message(msg.data)
                 elif msg.type == WSMsgType.ERROR:
-                    logger.error(f"{Fore.RED}[ERR] WebSocket error: {ws.exception()}{Style.RESET_ALL}\n")
+                    logger.error(f"{_ERR}WebSocket error: {ws.exception()}{_RST}\n")
                     break
                 elif msg.type == WSMsgType.CLOSE:
                     logger.info(f"{Fore.YELLOW}[WS] WebSocket connection closed by client{Style.RESET_ALL}")
                     break
                     
         except ConnectionResetError as e:
-            logger.error(f"{Fore.RED}[ERR] WebSocket connection reset: {e}{Style.RESET_ALL}\n")
+            logger.error(f"{_ERR}WebSocket connection reset: {e}{_RST}\n")
         except asyncio.TimeoutError as e:
-            logger.error(f"{Fore.RED}[ERR] WebSocket timeout: {e}{Style.RESET_ALL}\n")
+            logger.error(f"{_ERR}WebSocket timeout: {e}{_RST}\n")
         except Exception as e:
-            logger.error(f"{Fore.RED}[ERR] WebSocket error: {e}{Style.RESET_ALL}\n")
+            logger.error(f"{_ERR}WebSocket error: {e}{_RST}\n")
         finally:
             # Stop keep-alive task
             await self._stop_keepalive()
+            self._cancel_speculation()
             await self.llm_client.close()
             
             # Log connection duration for debugging
             if hasattr(self, 'connection_start_time'):
                 duration = datetime.now(timezone.utc) - self.connection_start_time
-                logger.info(f"{Fore.BLUE}[SYS] WebSocket connection closed after {duration.total_seconds():.1f}s{Style.RESET_ALL}")
+                logger.info(f"{_SYS}WebSocket connection closed after {duration.total_seconds():.1f}s{_RST}")
                 
                 # Warn if connection was very short (possible stability issue)
                 if duration.total_seconds() < 60:
-                    logger.warning(f"{Fore.YELLOW}[WARN] Short-lived WebSocket connection ({duration.total_seconds():.1f}s) - consider ngrok for stability{Style.RESET_ALL}")
+                    logger.warning(f"{_WARN}Short-lived WebSocket connection ({duration.total_seconds():.1f}s) - consider ngrok for stability{_RST}")
             else:
-                logger.info(f"{Fore.BLUE}[SYS] WebSocket connection closed{Style.RESET_ALL}")
+                logger.info(f"{_SYS}WebSocket connection closed{_RST}")
                 
         return ws
 
     async def route_message(self, message: str):
         try:
-            data = json.loads(message)
+            data = orjson.loads(message)
             event_type = data.get("event") or data.get("type")
             if event_type is None:
-                logger.warning(f"{Fore.YELLOW}[WARN] Missing 'event' field in message: {data}{Style.RESET_ALL}\n")
+                logger.warning(f"{_WARN}Missing 'event' field in message: {data}{_RST}\n")
             else:
-                logger.info(f"{Fore.MAGENTA}[SPI] Event received: {event_type}{Style.RESET_ALL}\n")
-                await self.handle_conversation_relay_event(data)
-        except json.JSONDecodeError as e:
-            logger.error(f"{Fore.RED}[ERR] Invalid JSON received: {e}{Style.RESET_ALL}\n")
+                logger.info(f"{_SPI}Event received: {event_type}{_RST}\n")
+                # One receipt timestamp per event, shared by everything the handlers broadcast
+                ts = datetime.now(timezone.utc).isoformat()
+                await self.handle_conversation_relay_event(data, ts, event_type)
+        except orjson.JSONDecodeError as e:
+            logger.error(f"{_ERR}Invalid JSON received: {e}{_RST}\n")
         except Exception as e:
-            logger.error(f"{Fore.RED}[ERR] Error routing message: {e}{Style.RESET_ALL}\n")
+            logger.error(f"{_ERR}Error routing message: {e}{_RST}\n")
 
-async def handle_conversation_relay_event(self, data: Dict[str, Any]):
-    event_type = data.get("event") or data.get("type")
-    if not event_type:
-        logger.warning("No 'event' field")
-        return
+    async def handle_conversation_relay_event(self, data: Dict[str, Any], ts: str = None, event_type: str = None):
+        """Dispatch a relay event; route_message passes the event_type it already resolved"""
+        event_type = event_type or data.get("event") or data.get("type")
+        if not event_type:
+            logger.warning("No 'event' field")
+            return
 
-    match event_type:
-        case "setup":
-            await self.handle_setup(data)
-        case "prompt":
-            await self.handle_prompt(data)
-        case "interrupt":
-            await self.handle_interrupt(data)
-        case "dtmf":
-            await self.handle_dtmf(data)
-        case "info" | "debug":
-            await self.handle_info_debug(event_type, data)
-        case "error":
-            await self.handle_relay_error(data)
-        case "close":
-            await self.handle_relay_close(data)
-        case _:
+        handler = self._handlers.get(event_type)
+        if handler is None:
             logger.warning(f"Unhandled Conversation Relay event: {event_type}")
-
-async def handle_relay_error(self, data: Dict[str, Any]):
-    # Twilio typically provides code/message/details
-    logger.error(f"[RELAY][ERROR] {json.dumps(data, ensure_ascii=False)}")
-    # Optional: speak a brief apology if appropriate
-    # await self.send_relay_say("Desculpe, houve um problema na chamada.", last=False)
-
-async def handle_relay_close(self, data: Dict[str, Any]):
-    reason = data.get("reason") or data.get("message") or "unknown"
-    code   = data.get("code")
-    logger.warning(f"[RELAY][CLOSE] code={code} reason={reason}")
-    # Stop keepalive immediately
-    await self._stop_keepalive()
-
-    async def handle_setup(self, data: Dict[str, Any]):
+            return
+        await handler(data, ts or datetime.now(timezone.utc).isoformat())
+
+    async def handle_relay_error(self, data: Dict[str, Any], ts: str = None):
+        # Twilio typically provides code/message/details
+        logger.error(f"[RELAY][ERROR] {orjson.dumps(data, default=safe_json).decode()}")
+        # Optional: speak a brief apology if appropriate
+        # await self.send_relay_say("Desculpe, houve um problema na chamada.", last=False)
+
+    async def handle_relay_close(self, data: Dict[str, Any], ts: str = None):
+        reason = data.get("reason") or data.get("message") or "unknown"
+        code   = data.get("code")
+        logger.warning(f"[RELAY][CLOSE] code={code} reason={reason}")
+        # Stop keepalive immediately
+        await self._stop_keepalive()
+
+    async def handle_setup(self, data: Dict[str, Any], ts: str):
         self.conversation_sid = data.get("callSid")
-        logger.info(f"{Fore.BLUE}[SYS] Conversation setup - SID: {self.conversation_sid}{Style.RESET_ALL}\n")
+        logger.info(f"{_SYS}Conversation setup - SID: {self.conversation_sid}{_RST}\n")
         self.language = 'pt-BR'
-        await self.broadcast_to_dashboard({"type": "setup", "ts": datetime.now(timezone.utc)
-.isoformat(), "data": data})
+        await self.broadcast_to_dashboard({"type": "setup", "ts": ts, "data": data})
 
         # Proactively inform Conversation Relay of initial language for TTS/STT
         try:
@@ -1185,10 +1464,10 @@ async def handle_relay_close(self, data: Dict[str, Any]):
                     "ttsLanguage": self.language,
                     "transcriptionLanguage": self.language,
                 }
-                await self.websocket.send_str(json.dumps(language_message))
-                logger.info(f"{Fore.YELLOW}[LANG] Sent initial language to Conversation Relay: {language_message}{Style.RESET_ALL}\n")
+                await self.websocket.send_str(orjson.dumps(language_message).decode())
+                logger.info(f"{_LANG}Sent initial language to Conversation Relay: {language_message}{_RST}\n")
         except Exception as e:
-            logger.error(f"{Fore.RED}[ERR] Failed to send initial language: {e}{Style.RESET_ALL}\n")
+            logger.error(f"{_ERR}Failed to send initial language: {e}{_RST}\n")
 
         # Extract customer phone number
         from_number = data.get("from", "")
@@ -1214,7 +1493,7 @@ async def handle_relay_close(self, data: Dict[str, Any]):
             self.active_agent = "Olli"
             logger.info(f"{Fore.CYAN}[ROUTE] PSTN/SIP call detected from {from_number} - routing to Olli (generalist){Style.RESET_ALL}\n")
 
-        logger.info(f"{Fore.YELLOW}[AGENT] Active agent set to: {self.active_agent}{Style.RESET_ALL}\n")
+        logger.info(f"{_AGENT}Active agent set to: {self.active_agent}{_RST}\n")
 
         # Immediately speak a tiny filler so the audio path is confirmed and the socket stays warm
         try:
@@ -1225,7 +1504,8 @@ async def handle_relay_close(self, data: Dict[str, Any]):
 
         # Initialize voice conversation in Conversations Manager
         if self.customer_phone and self.conversation_sid and self.conversations_logger:
-            conversation_sid = self.conversations_logger.create_voice_conversation(
+            conversation_sid = await asyncio.get_running_loop().run_in_executor(
+                self._conv_log_executor, self.conversations_logger.create_voice_conversation,
                 self.customer_phone, self.conversation_sid, self.active_agent
             )
             if conversation_sid:
@@ -1234,26 +1514,33 @@ async def handle_relay_close(self, data: Dict[str, Any]):
                 logger.warning(f"{Fore.YELLOW}[CONV] Failed to start voice conversation tracking{Style.RESET_ALL}\n")
 
         # Buscar contexto de personalização do cliente no Twilio Segment
-        self.personalization = get_personalization_context(data)
-        logger.info(f"{Fore.CYAN}[CX] Customer context: {json.dumps(self.personalization, indent=2)}{Style.RESET_ALL}\n")
+        self.personalization = await asyncio.to_thread(get_personalization_context, data)
+        self._profile_key = profile_cache_key(self.personalization)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("%sCustomer context: %s%s\n", _CX, orjson.dumps(self.personalization, default=safe_json, option=orjson.OPT_INDENT_2).decode(), _RST)
 
-        await self.broadcast_to_dashboard({"type": "setup", "ts": datetime.now(timezone.utc).isoformat(), "data": data})
+        await self.broadcast_to_dashboard({"type": "setup", "ts": ts, "data": data})
 
-    async def handle_prompt(self, data: Dict[str, Any]):
-        logger.info(f"{Fore.YELLOW}[AGENT] Current active agent: {self.active_agent}{Style.RESET_ALL}")
+    async def handle_prompt(self, data: Dict[str, Any], ts: str):
+        logger.info(f"{_AGENT}Current active agent: {self.active_agent}{_RST}")
         text = data.get("voicePrompt", "")
         interruptible = data.get("interruptible", True)
         preemptible = data.get("preemptible", True)
         last = data.get("last", True)
 
         # Store the latest flags to use in the TTS response
-        self.latest_prompt_flags = {
-            "interruptible": interruptible,
-            "preemptible": preemptible,
-            "last": last
-        }
+        self._interruptible = interruptible
+        self._preemptible = preemptible
+
+        if last is False:
+            # Partial prompt - get the LLM going now and check it against the final prompt later
+            log_debug(f"[STT] Partial prompt: {text}")
+            if text.strip():
+                self._start_speculation(text)
+            await self.broadcast_to_dashboard({"type": 'prompt', "ts": ts, "data": data})
+            return
 
-        logger.info(f"{Fore.CYAN}[STT] {text}{Style.RESET_ALL}\n")
+        logger.info(f"{_STT}{text}{_RST}\n")
         if text.strip():
             # Start a short-lived keep-alive loop while the LLM is thinking
             thinking = {'active': True}
@@ -1278,23 +1565,29 @@ async def handle_relay_close(self, data: Dict[str, Any]):
                 except asyncio.CancelledError:
                     pass
 
-        await self.broadcast_to_dashboard({"type": 'prompt', "ts": datetime.now(timezone.utc).isoformat(), "data": data})
+        await self.broadcast_to_dashboard({"type": 'prompt', "ts": ts, "data": data})
 
-    async def handle_interrupt(self, data: Dict[str, Any]):
-        logger.info(f"{Fore.MAGENTA}[SPI] Interrupt received: {json.dumps(data, indent=2)}{Style.RESET_ALL}\n")
-        await self.broadcast_to_dashboard({"type": "interrupt", "ts": datetime.now(timezone.utc).isoformat(), "data": data})
+    async def handle_interrupt(self, data: Dict[str, Any], ts: str):
+        event = {"type": "interrupt", "ts": ts, "data": data}
+        if logger.isEnabledFor(logging.INFO):
+            # Serialize once; the log line and the dashboard frame share the same JSON
+            event = orjson.dumps(event, default=safe_json).decode()
+            logger.info("%sInterrupt received: %s%s\n", _SPI, event, _RST)
+        await self.broadcast_to_dashboard(event)
 
-    async def handle_dtmf(self, data: Dict[str, Any]):
+    async def handle_dtmf(self, data: Dict[str, Any], ts: str):
         digit = data.get("digit")
-        logger.info(f"{Fore.MAGENTA}[SPI] DTMF received: {digit}{Style.RESET_ALL}\n")
+        logger.info(f"{_SPI}DTMF received: {digit}{_RST}\n")
         if digit:
             await self.process_complete_input(f"User pressed {digit}")
-        await self.broadcast_to_dashboard({"type": "dtmf", "ts": datetime.now(timezone.utc).isoformat(), "data": data})
+        await self.broadcast_to_dashboard({"type": "dtmf", "ts": ts, "data": data})
 
-    async def handle_info_debug(self, event_type: str, data: Dict[str, Any]):
-        formatted = json.dumps(data, indent=2, ensure_ascii=False)
-        logger.info(f"{Fore.MAGENTA}[SPI] {event_type.capitalize()} event:\n{formatted}{Style.RESET_ALL}\n")
-        await self.broadcast_to_dashboard({"type": event_type, "ts": datetime.now(timezone.utc).isoformat(), "data": data})
+    async def handle_info_debug(self, event_type: str, data: Dict[str, Any], ts: str):
+        event = {"type": event_type, "ts": ts, "data": data}
+        if logger.isEnabledFor(logging.INFO):
+            event = orjson.dumps(event, default=safe_json).decode()
+            logger.info("%s%s event: %s%s\n", _SPI, event_type.capitalize(), event, _RST)
+        await self.broadcast_to_dashboard(event)
 
     async def process_complete_input(self, text: str, thinking_state: dict = None):
         SUPPORTED_LANGUAGES = ["pt-BR", "es-US", "en-US"]
@@ -1309,8 +1602,9 @@ async def handle_relay_close(self, data: Dict[str, Any]):
             old_lang = self.language
 
             if new_lang != self.language:
-                logger.info(f"{Fore.YELLOW}[LANG] Language switched: {self.language} → {new_lang}{Style.RESET_ALL}\n")
+                logger.info(f"{_LANG}Language switched: {self.language} → {new_lang}{_RST}\n")
                 self.language = new_lang
+                self._system_cache.clear()
 
                 # Send language switch message to Conversation Relay
                 if self.websocket and new_lang in SUPPORTED_LANGUAGES:
@@ -1320,10 +1614,10 @@ async def handle_relay_close(self, data: Dict[str, Any]):
                         "transcriptionLanguage": new_lang,
                     }
                     try:
-                        await self.websocket.send_str(json.dumps(language_message))
-                        logger.info(f"{Fore.YELLOW}[LANG] Sent language change to Conversation Relay: {language_message}{Style.RESET_ALL}\n")
+                        await self.websocket.send_str(orjson.dumps(language_message).decode())
+                        logger.info(f"{_LANG}Sent language change to Conversation Relay: {language_message}{_RST}\n")
                     except Exception as e:
-                        logger.error(f"{Fore.RED}[ERR] Failed to send language switch: {e}{Style.RESET_ALL}\n")
+                        logger.error(f"{_ERR}Failed to send language switch: {e}{_RST}\n")
 
                 # Broadcast language switch
                 await self.broadcast_to_dashboard({
@@ -1333,7 +1627,7 @@ async def handle_relay_close(self, data: Dict[str, Any]):
 
             # Log user speech to voice conversation
             if self.customer_phone and self.conversations_logger:
-                self.conversations_logger.log_user_speech(self.customer_phone, text)
+                self._log_conversation(self.conversations_logger.log_user_speech, self.customer_phone, text)
 
             # Use standard banking tools approach (OpenAI Functions disabled)
             banking_response = None
@@ -1345,7 +1639,8 @@ async def handle_relay_close(self, data: Dict[str, Any]):
                     
                     # Log banking action
                     if self.conversations_logger:
-                        self.conversations_logger.log_banking_action(
+                        self._log_conversation(
+                            self.conversations_logger.log_banking_action,
                             self.customer_phone, 
                             "balance_check", 
                             {"success": True, "response_generated": True}
@@ -1363,18 +1658,15 @@ async def handle_relay_close(self, data: Dict[str, Any]):
 
             # If we have a banking response, use it; otherwise get AI response
             if banking_response:
+                self._cancel_speculation()
                 # Send banking response directly
                 response_text = banking_response
                 
-                # Send token by token for consistency with streaming
-                words = response_text.split()
-                for i, word in enumerate(words):
-                    if i == 0:
-                        await self.send_relay_say(word, last=False, interruptible=True)
-                    else:
-                        await self.send_relay_say(f" {word}", last=(i == len(words) - 1), interruptible=True)
-                    # Small delay to simulate natural speech
-                    await asyncio.sleep(0.05)
+                # One frame per sentence; TTS does its own pacing, so no per-word sends or delays
+                sentences = _SENTENCE_SPLIT_RX.split(response_text.strip())
+                for i, sentence in enumerate(sentences):
+                    await self.send_relay_say(sentence if i == 0 else f" {sentence}",
+                                              last=(i == len(sentences) - 1), interruptible=True)
                 
                 # Update chat history
                 self.chat_history.append({"role": "user", "content": text})
@@ -1384,50 +1676,65 @@ async def handle_relay_close(self, data: Dict[str, Any]):
                 # Get AI response using standard approach
                 ai_start_time = datetime.now(timezone.utc)
                 log_debug(f"[AI] Generating AI response for: {text}")
+                tokens = self._claim_speculation(text)
                 logger.info(f"{Fore.CYAN}[AI] Starting AI processing at {ai_start_time.isoformat()}, WebSocket alive: {self.websocket and not self.websocket.closed}{Style.RESET_ALL}")
                 self.chat_history.append({"role": "user", "content": text})
                 
                 # Send progress indicator to keep connection alive during AI processing
                 await self._send_processing_indicator()
                 
-                # First, collect the complete response
-                response_buffer = []
+                # Stream the response to TTS; only the flushed chunks are kept for history
+                requested_agent = None
                 token_count = 0
-                last_progress_time = datetime.now(timezone.utc)
+                self._reset_pending()
+                self._spoken_parts = []
+                clock = asyncio.get_running_loop().time  # Monotonic float; cheaper per token than aware datetimes
+                last_progress_time = clock()
                 
-                async for token in self.llm_client.get_completion_from_history(
-                    history=self.chat_history,
-                    language=self.language,
-                    agent_name=self.active_agent,
-                    customer_profile=self.personalization
-                ):
-                    response_buffer.append(token)
+                if tokens is not None:
+                    logger.info(f"{Fore.CYAN}[AI] Using speculative response started on partial prompt{Style.RESET_ALL}")
+                else:
+                    tokens = self.llm_client.get_completion_from_history(
+                        history=self.chat_history,
+                        language=self.language,
+                        agent_name=self.active_agent,
+                        customer_profile=self.personalization,
+                        system_message=self._system_message()
+                    )
+                async for token in tokens:
                     token_count += 1
+                    requested_agent = await self._buffer_token(token)
+                    if requested_agent:
+                        # Routing tag complete - nothing after it would be spoken
+                        await tokens.aclose()
+                        break
                     
                     # Send ping every 1 second to prevent Railway timeout (ultra-aggressive keep-alive during AI processing)
-                    current_time = datetime.now(timezone.utc)
-                    if (current_time - last_progress_time).total_seconds() >= 1.0:
+                    current_time = clock()
+                    if current_time - last_progress_time >= 1.0:
                         await self._send_processing_indicator()
                         last_progress_time = current_time
                         
-                    if DEBUG_MODE and token_count % 10 == 0:  # Log every 10 tokens in debug mode
+                    if DEBUG_MODE and token_count % 10 == 0:  # DEBUG_MODE short-circuits, no modulo when off
                         log_debug(f"[AI] Received {token_count} tokens so far")
             
-                response_text = ''.join(response_buffer).strip()
-                log_debug(f"[AI] Complete response generated ({len(response_buffer)} tokens): {response_text[:100]}...")
+                if requested_agent is None:
+                    requested_agent = self._finish_route()
+                # Flush whatever is still pending and close the response with last=true
+                await self._flush_tokens(last=True)
+
+                # The route tag is never flushed, so the spoken chunks are already the clean reply
+                response_text = ''.join(self._spoken_parts)
+                log_debug(f"[AI] Complete response generated ({token_count} tokens): {response_text[:100]}...")
                 
-                # Check for #route_to:<Agent> and remove it from the response
-                route_match = re.search(r"#route_to:(\w+)", response_text)
-                if route_match:
-                    requested_agent = route_match.group(1)
-                    # Remove the routing command from the response text before storing in history
-                    clean_response = re.sub(r"\s*#route_to:\w+\s*", "", response_text).strip()
-                    self.chat_history.append({"role": "assistant", "content": clean_response})
+                if requested_agent:
+                    self.chat_history.append({"role": "assistant", "content": response_text})
                     
                     if registry.get_agent(requested_agent):
-                        logger.info(f"{Fore.YELLOW}[ROUTE] Routing to agent: {requested_agent}{Style.RESET_ALL}")
+                        logger.info(f"{_ROUTE}Routing to agent: {requested_agent}{_RST}")
                         old_agent = self.active_agent
                         self.active_agent = requested_agent
+                        self._system_cache.clear()
                         logger.info(f"{Fore.GREEN}[AGENT] Active agent updated: {old_agent} -> {self.active_agent}{Style.RESET_ALL}")
                         
                         # Add context transfer message for the new agent
@@ -1438,36 +1745,181 @@ async def handle_relay_close(self, data: Dict[str, Any]):
                             "type": "agent-switch",
                             "data": {"from": old_agent, "to": requested_agent}
                         })
-                        
-                        # Set response_text to the clean version without routing command
-                        response_text = clean_response
                     else:
-                        logger.warning(f"{Fore.YELLOW}[WARN] Unknown agent requested: {requested_agent}{Style.RESET_ALL}")
-                        # Still clean the response even if agent is unknown
-                        response_text = re.sub(r"\s*#route_to:\w+\s*", "", response_text).strip()
-                        self.chat_history.append({"role": "assistant", "content": response_text})
+                        logger.warning(f"{_WARN}Unknown agent requested: {requested_agent}{_RST}")
                 else:
                     self.chat_history.append({"role": "assistant", "content": response_text})
-                
-                # Stream response as meaningful text chunks for optimal TTS
-                if response_text.strip():
-                    log_debug(f"[TTS] Streaming complete response using Relay native schema: {len(response_text)} characters")
-                    
-                    # Send the complete response using response.create with last=true
-                    await self.send_relay_say(response_text, last=True, interruptible=True)
-                    log_debug(f"[TTS] Complete response sent to ConversationRelay for vocalization with last=true")
-                else:
-                    log_debug(f"[TTS] No response text to stream")
-            
+
+            self._trim_history()
             
             # Log agent response to voice conversation
             if self.customer_phone and self.conversations_logger and response_text:
-                self.conversations_logger.log_agent_response(self.customer_phone, response_text)
+                self._log_conversation(self.conversations_logger.log_agent_response, self.customer_phone, response_text)
             
         except Exception as e:
-            logger.error(f"{Fore.RED}[ERR] Error processing input: {e}{Style.RESET_ALL}\n")
+            logger.error(f"{_ERR}Error processing input: {e}{_RST}\n")
             await self.send_relay_say("Desculpe, não consegui processar sua solicitação.", last=True, interruptible=True)
 
+    def _log_conversation(self, method, *args):
+        """Queue a ConversationsLogger call without waiting for it; calls run in submission order"""
+        self._conv_log_executor.submit(method, *args)
+
+    def _trim_history(self):
+        """Close the turn and keep only the last CHAT_HISTORY_MAX_TURNS exchanges; the system prompt is added per request"""
+        self._turn += 1
+        limit = CHAT_HISTORY_MAX_TURNS * 2
+        if len(self.chat_history) > limit:
+            del self.chat_history[:-limit]
+
+    def _reset_pending(self):
+        self._pending_tokens.clear()
+        self._pending_len = 0
+        self._pending_sent = False
+        self._held_chunk = None
+        self._route_tail = ""
+
+    def _queue_text(self, text: str):
+        if text:
+            self._pending_tokens.append(text)
+            self._pending_len += len(text)
+
+    async def _queue_speech(self, text: str):
+        """Queue reply text, release the held chunk once real speech follows it, and flush the batch
+        at a sentence end or once it grows past the threshold"""
+        self._queue_text(text)
+        if self._held_chunk is not None and text and not text.isspace():
+            await self._send_held(last=False)
+        if (self._pending_len >= self.config.flush_threshold
+                or not self.config.sentence_end_patterns.isdisjoint(text)):
+            await self._flush_tokens(last=False)
+
+    async def _buffer_token(self, token: str):
+        """Queue an LLM token and flush the batch at a sentence end or once it grows past the threshold.
+        Returns the requested agent as soon as a complete #route_to tag has streamed in."""
+        if not self._route_tail:
+            mark = token.find('#')
+            if mark == -1:
+                await self._queue_speech(token)
+                return None
+            # Possible #route_to tag - hold it back so it is never spoken
+            await self._queue_speech(token[:mark])
+            token = token[mark:]
+        tail = self._route_tail = self._route_tail + token
+        if tail[:len(ROUTE_PREFIX)] != ROUTE_PREFIX[:len(tail)]:
+            # Just a '#' in the reply - release it and carry on
+            self._route_tail = ""
+            await self._queue_speech('#')
+            return await self._buffer_token(tail[1:]) if len(tail) > 1 else None
+        match = _ROUTE_DONE_RX.match(tail)
+        return match.group(1) if match else None
+
+    def _finish_route(self):
+        """Requested agent if the stream ended on a #route_to tag; otherwise release the held text"""
+        match = _ROUTE_RX.fullmatch(self._route_tail.rstrip())
+        if not match:
+            self._queue_text(self._route_tail)
+        self._route_tail = ""
+        return match.group(1) if match else None
+
+    async def _flush_tokens(self, *, last: bool):
+        """Close the pending tokens into a chunk. Chunks are held until more speech arrives, so with last=True
+        the final chunk goes out as the last=true frame instead of a separate empty one."""
+        text = ''.join(self._pending_tokens)
+        self._pending_tokens.clear()
+        self._pending_len = 0
+        if not self._pending_sent:
+            text = text.lstrip()
+        if last:
+            text = text.rstrip()
+            if text:
+                await self._send_held(last=False)
+                await self._send_chunk(text, last=True)
+            elif self._held_chunk is not None:
+                await self._send_held(last=True)
+            self._pending_sent = False
+            return
+        if not text:
+            return
+        if text.isspace() and self._held_chunk is not None:
+            # Whitespace after a held sentence (e.g. a lone newline) is not worth its own frame
+            self._held_chunk += text
+            return
+        await self._send_held(last=False)
+        self._held_chunk = text
+        self._pending_sent = True
+
+    async def _send_held(self, *, last: bool):
+        if self._held_chunk is None:
+            return
+        text = self._held_chunk.rstrip() if last else self._held_chunk
+        self._held_chunk = None
+        await self._send_chunk(text, last=last)
+
+    async def _send_chunk(self, text: str, *, last: bool):
+        await self.send_relay_say(text, last=last, interruptible=self._interruptible)
+        self._spoken_parts.append(text)
+
+    def _speculation_key(self, text: str) -> tuple:
+        return (" ".join(text.split()).lower(), self.active_agent, self.language, self._turn)
+
+    def _start_speculation(self, text: str):
+        """Start streaming a reply for a partial prompt; tokens wait in a queue until the turn is final"""
+        key = self._speculation_key(text)
+        if key == self._spec_key:
+            return
+        self._cancel_speculation()
+        self._spec_key = key
+        self._spec_queue = asyncio.Queue()
+        history = self.chat_history + [{"role": "user", "content": text}]
+        self._spec_task = asyncio.create_task(self._speculative_stream(history, self._spec_queue))
+
+    async def _speculative_stream(self, history: list, queue: asyncio.Queue):
+        try:
+            async for token in self.llm_client.get_completion_from_history(
+                history=history,
+                language=self.language,
+                agent_name=self.active_agent,
+                customer_profile=self.personalization,
+                system_message=self._system_message()
+            ):
+                queue.put_nowait(token)
+        finally:
+            queue.put_nowait(None)
+
+    def _cancel_speculation(self):
+        if self._spec_task and not self._spec_task.done():
+            self._spec_task.cancel()
+        self._spec_task = None
+        self._spec_key = None
+        self._spec_queue = None
+
+    def _claim_speculation(self, text: str):
+        """Token stream of the speculation if it was built for this exact prompt, else cancel it and return None.
+        Call before the user turn is appended to chat_history."""
+        if self._spec_key != self._speculation_key(text):
+            self._cancel_speculation()
+            return None
+        tokens = self._drain_speculation(self._spec_queue, self._spec_task)
+        self._spec_task = self._spec_key = self._spec_queue = None
+        return tokens
+
+    @staticmethod
+    async def _drain_speculation(queue: asyncio.Queue, task: asyncio.Task):
+        try:
+            while (token := await queue.get()) is not None:
+                yield token
+        finally:
+            task.cancel()
+
+    def _system_message(self) -> dict:
+        """System message for the active agent, language and customer profile, built once per combination"""
+        key = (self.active_agent, self.language, self._profile_key)
+        message = self._system_cache.get(key)
+        if message is None:
+            content = _render_system_prompt(self.active_agent, self.language, self._profile_key, "history")
+            message = self._system_cache[key] = {"role": "system", "content": content}
+        return message
+
     async def send_relay_say(self, text: str, *, last: bool, interruptible: bool = True):
         """
         Sends a TTS instruction using Conversation Relay's response.create schema.
@@ -1488,19 +1940,9 @@ async def handle_relay_close(self, data: Dict[str, Any]):
             })
             return
 
-        payload = {
-            "type": "response.create",
-            "response": {
-                "instructions": [
-                    {"type": "say", "text": text, "language": self.language}
-                ],
-                "bargeIn": interruptible
-            },
-            "last": last
-        }
-
         try:
-            msg = json.dumps(payload, ensure_ascii=True)
+            # Only the text needs encoding; the rest of the frame comes from a cached template
+            msg = _RELAY_SAY_PREFIX + json.dumps(text, ensure_ascii=True) + relay_say_suffix(self.language, interruptible, last)
             logger.info(f"[TTS][relay] Sending response.create (last={last}, len={len(text)}): {text[:80]}...")
             await self.websocket.send_str(msg)
             self.connection_health = True
@@ -1508,26 +1950,37 @@ async def handle_relay_close(self, data: Dict[str, Any]):
         except Exception as e:
             logger.error(f"[TTS][relay] Send failed: {type(e).__name__}: {e}")
             self.connection_health = False
-            self.response_buffer.append(payload)
+            self.response_buffer.append({
+                "type": "response.create",
+                "response": {
+                    "instructions": [
+                        {"type": "say", "text": text, "language": self.language}
+                    ],
+                    "bargeIn": interruptible
+                },
+                "last": last
+            })
 
-    async def send_response(self, text: str, partial: bool = True):
-        # Build message first
+    def _text_token_msg(self, text: str, partial: bool) -> dict:
+        """The "text" token frame as a dict, for the resend buffer"""
         msg = {
             "type": "text",
             "token": text,
             "last": not partial,
-            "interruptible": True,   # Allow caller to interrupt TTS
-            "preemptible": False     # Don't allow subsequent messages to stop this one
+            "interruptible": self._interruptible,
+            "preemptible": self._preemptible
         }
 
         # Add language code for TTS (as per Twilio docs)
-        if hasattr(self, 'language') and self.language:
+        if self.language:
             msg["lang"] = self.language
-        
+        return msg
+
+    async def send_response(self, text: str, partial: bool = True):
         # Quick check - if WebSocket is obviously closed, buffer the response
         if not self.websocket or self.websocket.closed:
             logger.warning(f"[BUFF] WebSocket closed - buffering response: '{text[:50]}{'...' if len(text) > 50 else ''}'")
-            self.response_buffer.append(msg)
+            self.response_buffer.append(self._text_token_msg(text, partial))
             return
 
         # Try to send - let the exception handler catch any real issues
@@ -1538,16 +1991,14 @@ async def handle_relay_close(self, data: Dict[str, Any]):
         if self.response_buffer:
             await self._attempt_buffer_flush()
 
-        # Log in debug mode but ALWAYS send
-        if DEBUG_MODE:
-            log_debug(f"[TTS] Sending text token to ConversationRelay: {json.dumps(msg, ensure_ascii=False)}")
-
         try:
-            # Use ensure_ascii=True for Render compatibility
-            message_json = json.dumps(msg, ensure_ascii=True)
+            # Same bytes as json.dumps(msg, ensure_ascii=True) - ASCII-only for Render compatibility
+            message_json = _TEXT_TOKEN_PREFIX + json.dumps(text, ensure_ascii=True) + text_token_suffix(
+                not partial, self._interruptible, self._preemptible, self.language
+            )
             
             # Log message details for debugging
-            logger.info(f"[TTS] Sending WebSocket message: {message_json}")
+            logger.info("[TTS] Sending WebSocket message: %s", message_json)
             
             await self.websocket.send_str(message_json)
             
@@ -1561,17 +2012,17 @@ async def handle_relay_close(self, data: Dict[str, Any]):
         except ConnectionResetError as e:
             logger.error(f"[ERR] WebSocket connection reset while sending: {e}")
             self.connection_health = False
-            self.response_buffer.append(msg)  # Buffer this message
+            self.response_buffer.append(self._text_token_msg(text, partial))  # Buffer this message
         except asyncio.TimeoutError as e:
             logger.error(f"[ERR] WebSocket send timeout: {e}")
             self.connection_health = False
-            self.response_buffer.append(msg)  # Buffer this message
+            self.response_buffer.append(self._text_token_msg(text, partial))  # Buffer this message
         except Exception as e:
             logger.error(f"[ERR] Failed to send text token: {e}")
             logger.error(f"[TTS] WebSocket send error: {type(e).__name__}: {str(e)}")
             logger.error(f"[TTS] WebSocket state: closed={self.websocket.closed if self.websocket else 'None'}")
             self.connection_health = False
-            self.response_buffer.append(msg)  # Buffer this message
+            self.response_buffer.append(self._text_token_msg(text, partial))  # Buffer this message
     
     async def _test_connection_health(self) -> bool:
         """Test WebSocket connection health with ping/pong"""
@@ -1614,7 +2065,7 @@ async def handle_relay_close(self, data: Dict[str, Any]):
             try:
                 message_json = json.dumps(msg, ensure_ascii=True)
                 await self.websocket.send_str(message_json)
-                logger.info(f"[BUFF] Flushed buffered message {i+1}/{len(messages_to_send)}: {msg.get('token', '')[:50]}...")
+                logger.info("[BUFF] Flushed buffered message %d/%d: %.50s...", i + 1, len(messages_to_send), msg.get('token', ''))
                 
                 # Small delay between messages to avoid overwhelming the connection
                 if i < len(messages_to_send) - 1:
@@ -1659,7 +2110,7 @@ async def broadcast_to_pwa_clients(payload: dict):
     if not pwa_clients:
         return
         
-    msg = json.dumps(payload)
+    msg = orjson.dumps(payload).decode()
     disconnected_clients = set()
     
     for ws in pwa_clients:
@@ -1701,6 +2152,10 @@ def safe_json(obj):
         return float(obj)
     raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
 
+def orjson_response(obj, status: int = 200) -> web.Response:
+    """JSON response encoded with orjson; NaN/Infinity come out as null, so no sanitize_json pass is needed"""
+    return web.Response(body=orjson.dumps(obj, default=safe_json), status=status, content_type="application/json")
+
 
 def sanitize_json(obj):
     if isinstance(obj, float) and (math.isnan(obj) or math.isinf(obj)):
@@ -1714,56 +2169,64 @@ def sanitize_json(obj):
     return obj
 
 
-async def handle_intelligence_result(transcript_sid: str, ws_handler: TwilioWebSocketHandler):
-    try:
-        transcript = twilio_client.intelligence.v2.transcripts(transcript_sid).fetch()
-        operator_results = twilio_client.intelligence.v2.transcripts(transcript_sid).operator_results.list()
+def fetch_intelligence_payload(transcript_sid: str) -> dict:
+    """Fetch a transcript and its operator results from Twilio (blocking; run it in a worker thread)"""
+    transcript_ctx = twilio_client.intelligence.v2.transcripts(transcript_sid)
+    transcript = transcript_ctx.fetch()
 
-        payload = {
-            "type": "intelligence",
-            "ts": transcript.date_created.isoformat(),
-            "data": {
-                "transcript": {
-                    "sid": transcript.sid,
-                    "status": transcript.status,
-                    "language": transcript.language_code,
-                    "duration": transcript.duration,
-                    "url": transcript.url,
-                    "links": transcript.links
-                },
-                "operators": []
-            }
+    payload = {
+        "type": "intelligence",
+        "ts": transcript.date_created.isoformat(),
+        "data": {
+            "transcript": {
+                "sid": transcript.sid,
+                "status": transcript.status,
+                "language": transcript.language_code,
+                "duration": transcript.duration,
+                "url": transcript.url,
+                "links": transcript.links
+            },
+            "operators": []
         }
+    }
 
-        for op in operator_results:
-            result_data = {
-                "name": op.name,
-                "type": op.operator_type,
-                "url": op.url,
-                "transcript_sid": op.transcript_sid,
-            }
+    # stream() pages lazily, so operators are converted while later pages are fetched
+    for op in transcript_ctx.operator_results.stream():
+        result_data = {
+            "name": op.name,
+            "type": op.operator_type,
+            "url": op.url,
+            "transcript_sid": op.transcript_sid,
+        }
+
+        # Parse results by operator type
+        if op.operator_type == "text-generation" and op.text_generation_results:
+            result_data["text_result"] = op.text_generation_results.get("result")
 
-            # Parse results by operator type
-            if op.operator_type == "text-generation" and op.text_generation_results:
-                result_data["text_result"] = op.text_generation_results.get("result")
+        elif op.operator_type == "conversation-classify":
+            result_data["predicted_label"] = op.predicted_label
+            result_data["predicted_probability"] = op.predicted_probability
+            result_data["label_probabilities"] = op.label_probabilities
 
-            elif op.operator_type == "conversation-classify":
-                result_data["predicted_label"] = op.predicted_label
-                result_data["predicted_probability"] = op.predicted_probability
-                result_data["label_probabilities"] = op.label_probabilities
+        elif op.operator_type == "extract":
+            result_data["extract_results"] = op.extract_results
+            result_data["match_probability"] = op.match_probability
+            result_data["extract_match"] = op.extract_match
+            result_data["utterance_results"] = op.utterance_results
 
-            elif op.operator_type == "extract":
-                result_data["extract_results"] = op.extract_results
-                result_data["match_probability"] = op.match_probability
-                result_data["extract_match"] = op.extract_match
-                result_data["utterance_results"] = op.utterance_results
+        # Add other types as needed here...
 
-            # Add other types as needed here...
+        payload["data"]["operators"].append(result_data)
 
-            payload["data"]["operators"].append(result_data)
+    return payload
 
-        await ws_handler.broadcast_to_dashboard(json.loads(json.dumps(payload, default=safe_json)))
+async def handle_intelligence_result(transcript_sid: str, ws_handler: TwilioWebSocketHandler):
+    try:
+        payload = await asyncio.to_thread(fetch_intelligence_payload, transcript_sid)
+        await ws_handler.broadcast_to_dashboard(sanitize_json(payload))
         persist_result(payload)
+        # Push the updated totals so dashboards don't have to poll /intel-aggregates
+        await ws_handler.broadcast_to_dashboard({"type": "intel-aggregates", "data": load_aggregated_intel_results()})
 
         logger.info(f"{Fore.GREEN}[INTEL] Broadcasted intelligence for {transcript_sid}{Style.RESET_ALL}")
     except Exception as e:
@@ -1774,7 +2237,7 @@ async def handle_event_streams_webhook(request, ws_handler: TwilioWebSocketHandl
         body = await request.text()
         logger.info(f"{Fore.MAGENTA}[SPI] Event Streams webhook received: {body}{Style.RESET_ALL}")
 
-        data = json.loads(body)
+        data = orjson.loads(body)
         transcript_sid = data.get("transcript_sid") or data.get("TranscriptSid")
 
         if transcript_sid:
@@ -1816,7 +2279,7 @@ async def process_transcription_event(event_type: str, data: dict, call_sid: str
             try:
                 import urllib.parse
                 decoded_data = urllib.parse.unquote(transcription_data)
-                transcript_info = json.loads(decoded_data)
+                transcript_info = orjson.loads(decoded_data)
                 
                 transcript_text = transcript_info.get("transcript", "")
                 confidence = transcript_info.get("confidence", 0)
@@ -1879,7 +2342,7 @@ async def generate_voice_twiml(request):
         />
     </Start>
     <Connect>
-        <ConversationRelay url="wss://{host}/websocket"/>
+        <ConversationRelay url="wss://{host}/websocket"{' partialPrompts="true"' if SPECULATIVE_LLM else ''}/>
     </Connect>
 </Response>'''
         
@@ -1936,14 +2399,15 @@ async def handle_dashboard(request):
 async def handle_dashboard_ws(request, ws_handler):
     ws = web.WebSocketResponse()
     await ws.prepare(request)
-    ws_handler.dashboard_clients.add(ws)
+    ws_handler.dashboard_clients.append(ws)
 
     try:
         async for msg in ws:
             if msg.type == WSMsgType.ERROR:
                 log_debug(f"[WARN] Dashboard WS closed with exception {ws.exception()}")
     finally:
-        ws_handler.dashboard_clients.discard(ws)
+        if ws in ws_handler.dashboard_clients:
+            ws_handler.dashboard_clients.remove(ws)
     return ws
 
 async def proxy_to_conversations(request):
@@ -2003,40 +2467,63 @@ async def proxy_to_conversations(request):
 
 from datetime import datetime, timedelta
 
+# Transcripts fetched concurrently by the startup preload
+PRELOAD_CONCURRENCY = 8
+
+# Most unprocessed transcripts fetched per startup; older ones arrive through the webhook as usual
+PRELOAD_MAX = int(os.getenv("PRELOAD_MAX", "100"))
+
+# Listed transcript SIDs allowed to wait for a preload worker before listing pauses
+PRELOAD_QUEUE_MAX = 32
+
+def iter_unprocessed_transcripts(service_sid: str, created_after: str):
+    """SIDs of the service's transcripts created after created_after (ISO-8601) that haven't been persisted yet.
+    Filtered by Twilio and paged lazily; blocking, so iterate it in a worker thread."""
+    for t in twilio_client.intelligence.v2.transcripts.stream(
+        service_sid=service_sid,
+        after_date_created=created_after,
+        page_size=50
+    ):
+        if t.sid in known_sids:
+            log_debug(f"[SKIP] Already processed: {t.sid}")
+            continue
+        yield t.sid
+
 async def preload_transcripts_for_service(service_sid: str, ws_handler: TwilioWebSocketHandler):
     try:
-        # Load already-processed transcript SIDs
-        existing_sids = set()
-        if NDJSON_FILE.exists():
-            try:
-                df = pd.read_json(NDJSON_FILE, lines=True)
-                if "transcript_sid" in df.columns:
-                    existing_sids = set(df["transcript_sid"].dropna().astype(str))
-            except Exception as e:
-                log_debug(f"[WARN] Failed to read existing results: {e}")
-
         # Look back sufficiently far if needed
         start_time = datetime.now(timezone.utc) - timedelta(days=30)
         cursor = start_time.strftime('%Y-%m-%dT%H:%M:%SZ')
 
         log_debug(f"{Fore.BLUE}[INIT] Fetching transcripts created after {cursor}{Style.RESET_ALL}")
 
-        transcripts = twilio_client.intelligence.v2.transcripts.list(
-            limit=100
-        )
-
+        # Listing pages feeds a bounded queue drained by PRELOAD_CONCURRENCY workers, so paging overlaps
+        # the detail fetches and a long window never holds more than PRELOAD_QUEUE_MAX SIDs in memory
+        queue = asyncio.Queue(maxsize=PRELOAD_QUEUE_MAX)
+        loop = asyncio.get_running_loop()
         fetched = 0
-        for t in transcripts:
-            if t.service_sid != service_sid:
-                continue
 
-            if t.sid in existing_sids:
-                log_debug(f"[SKIP] Already processed: {t.sid}")
-                continue
+        def produce():
+            for sid in itertools.islice(iter_unprocessed_transcripts(service_sid, cursor), PRELOAD_MAX):
+                asyncio.run_coroutine_threadsafe(queue.put(sid), loop).result()
+
+        async def worker():
+            nonlocal fetched
+            while (transcript_sid := await queue.get()) is not None:
+                log_debug(f"[PRELOAD] Processing: {transcript_sid}")
+                await handle_intelligence_result(transcript_sid, ws_handler)
+                fetched += 1
 
-            log_debug(f"[PRELOAD] Processing: {t.sid}")
-            await handle_intelligence_result(t.sid, ws_handler)
-            fetched += 1
+        workers = [asyncio.create_task(worker()) for _ in range(PRELOAD_CONCURRENCY)]
+        try:
+            await asyncio.to_thread(produce)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            # Stops the workers if listing failed or the preload was cancelled at shutdown; no-op once drained
+            for task in workers:
+                task.cancel()
 
         logger.info(f"{Fore.BLUE}[INIT] Finished loading {fetched} transcripts for service {service_sid}{Style.RESET_ALL}")
 
@@ -2124,10 +2611,10 @@ async def main():
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "environment": os.getenv('DEPLOYMENT_ENVIRONMENT', 'local')
     }))
-    app.router.add_get('/intel-aggregates', lambda req: web.json_response(
-        sanitize_json(load_aggregated_intel_results(req.rel_url.query.get("group", "day")))
+    app.router.add_get('/intel-aggregates', lambda req: orjson_response(
+        load_aggregated_intel_results(req.rel_url.query.get("group", "day"))
     ))
-    app.router.add_get('/intel-events', lambda req: web.json_response(load_recent_events()))
+    app.router.add_get('/intel-events', lambda req: orjson_response(load_recent_events()))
     app.router.add_get('/conversation/{conversation_sid}/intelligence', get_conversation_intelligence)
     app.router.add_get('/test-transcripts', test_transcripts)
     
@@ -2200,13 +2687,6 @@ async def main():
         logger.info(f"{Fore.GREEN}[SYS] PWA transcription WebSocket: ws://{host}:{port}/pwa-transcripts{Style.RESET_ALL}\n")
         logger.info(f"{Fore.CYAN}[SYS] Dashboard: http://{host}:{port}/dashboard{Style.RESET_ALL}\n")
     
-    # Get the intelligence service SID from environment variables
-    intelligence_service_sid = os.getenv("TWILIO_INTELLIGENCE_SERVICE_SID")
-    if intelligence_service_sid:
-        await preload_transcripts_for_service(intelligence_service_sid, ws_handler)
-    else:
-        logger.warning(f"{Fore.YELLOW}[WARN] TWILIO_INTELLIGENCE_SERVICE_SID not found in environment variables{Style.RESET_ALL}")
-    
     # Configure access logging - disable in production, enable in debug mode
     access_log = logger if DEBUG_MODE else None
     runner = web.AppRunner(app, access_log=access_log)
@@ -2216,22 +2696,41 @@ async def main():
 
     # Optional: keep the same printed messages
     logger.info(f"{Fore.BLUE}[SYS] Server running at http://{host}:{port}{Style.RESET_ALL}")
-    while True:
-        await asyncio.sleep(3600)
+
+    # Preload past transcripts in the background so the port is open (and health checks pass) meanwhile
+    preload_task = None
+    intelligence_service_sid = os.getenv("TWILIO_INTELLIGENCE_SERVICE_SID")
+    if intelligence_service_sid:
+        preload_task = asyncio.create_task(preload_transcripts_for_service(intelligence_service_sid, ws_handler))
+    else:
+        logger.warning(f"{Fore.YELLOW}[WARN] TWILIO_INTELLIGENCE_SERVICE_SID not found in environment variables{Style.RESET_ALL}")
+
+    # Serve until SIGINT/SIGTERM; where the loop can't install signal handlers (Windows), Ctrl+C raises KeyboardInterrupt
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+    try:
+        await stop.wait()
+    finally:
+        if preload_task is not None:
+            preload_task.cancel()
+        await runner.cleanup()
 
 if __name__ == "__main__":
+    if UVLOOP_AVAILABLE:
+        # Must be set before asyncio.run() creates the loop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logger.info(f"{Fore.BLUE}[SYS] Using uvloop event loop{Style.RESET_ALL}")
+    stopped = False
     try:
-        asyncio.run(main())
+        asyncio.run(main())  # Returns once a stop signal arrives
+        stopped = True
     except KeyboardInterrupt:
-        logger.info(f"{Fore.BLUE}[SYS] Server stopped by user{Style.RESET_ALL}\n")
-        # Clean up ngrok tunnels if available
-        if NGROK_AVAILABLE:
-            try:
-                ngrok.disconnect_all()
-                ngrok.kill()
-                logger.info(f"{Fore.YELLOW}[NGROK] Tunnels disconnected{Style.RESET_ALL}\n")
-            except Exception as ngrok_error:
-                logger.error(f"{Fore.RED}[NGROK] Error cleaning up tunnels: {ngrok_error}{Style.RESET_ALL}\n")
+        stopped = True
     except Exception as e:
         logger.error(f"{Fore.RED}[ERR] Server error: {e}{Style.RESET_ALL}\n")
         # Clean up ngrok tunnels on error too if available
@@ -2241,3 +2740,13 @@ if __name__ == "__main__":
                 ngrok.kill()
             except:
                 pass
+    if stopped:
+        logger.info(f"{Fore.BLUE}[SYS] Server stopped by user{Style.RESET_ALL}\n")
+        # Clean up ngrok tunnels if available
+        if NGROK_AVAILABLE:
+            try:
+                ngrok.disconnect_all()
+                ngrok.kill()
+                logger.info(f"{Fore.YELLOW}[NGROK] Tunnels disconnected{Style.RESET_ALL}\n")
+            except Exception as ngrok_error:
+                logger.error(f"{Fore.RED}[NGROK] Error cleaning up tunnels: {ngrok_error}{Style.RESET_ALL}\n")
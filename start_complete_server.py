@@ -167,13 +167,6 @@ def check_server_requirements():
         if not (base_dir / file_path).exists():
             print(f"ℹ️ Optional server {file_path} not found, will skip...")
     
-    # Check if pandas is available for Signal SP Session
-    try:
-        import pandas
-        print("✅ Pandas available - Signal SP Session analytics enabled")
-    except ImportError:
-        print("⚠️ Pandas not available - Signal SP Session will be skipped")
-    
     return True
 
 def get_server_config():
@@ -215,21 +208,16 @@ def get_server_config():
         }
     ]
     
-    # Signal Analytics - only if pandas is available
-    try:
-        import pandas
-        optional_servers.append({
-            'name': 'SignalAnalytics',
-            'command': 'python server.py', 
-            'cwd': base_dir / 'Signal SP Session',
-            'env': {
-                'PORT': os.environ['SIGNAL_ANALYTICS_PORT']
-            },
-            'file_check': 'Signal SP Session/server.py'
-        })
-        print("✅ Including Signal Analytics (pandas available)")
-    except ImportError:
-        print("⚠️ Skipping Signal Analytics (pandas not available)")
+    # Signal Analytics - the intelligence analytics no longer need pandas
+    optional_servers.append({
+        'name': 'SignalAnalytics',
+        'command': 'python server.py', 
+        'cwd': base_dir / 'Signal SP Session',
+        'env': {
+            'PORT': os.environ['SIGNAL_ANALYTICS_PORT']
+        },
+        'file_check': 'Signal SP Session/server.py'
+    })
     
     # Add optional servers if they exist
     for server in optional_servers:
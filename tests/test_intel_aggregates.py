@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for the running intelligence aggregates (aggregate_intel_result / load_aggregated_intel_results)
+against hand-computed totals
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "Signal SP Session"))
+server = pytest.importorskip("server")
+
+NAN = float("nan")
+
+RECORDS = [
+    # Monday 2025-01-06, week 01 (%U weeks start on Sunday)
+    {"ts": "2025-01-06T10:00:00Z", "csat_score": 4, "ces_score": 2, "hallucination_occurrences": 1,
+     "legal_risk_score": 3, "positive_sentiment_score": 80, "neutral_sentiment_score": 10,
+     "negative_sentiment_score": 10},
+    # Missing CSAT, NaN CES/hallucinations, numeric string legal risk
+    {"ts": "2025-01-06T15:30:00+00:00", "csat_score": None, "ces_score": NAN, "hallucination_occurrences": NAN,
+     "legal_risk_score": "2", "neutral_sentiment_score": 60},
+    # A score of exactly 50 doesn't count as that sentiment
+    {"ts": "2025-01-08T09:00:00Z", "csat_score": "5", "ces_score": 4, "positive_sentiment_score": 50,
+     "negative_sentiment_score": 51},
+    # Unparseable timestamp - left out of every group
+    {"ts": "not-a-date", "csat_score": 1, "ces_score": 1},
+    # Saturday 2025-02-01, week 04; no CES at all
+    {"ts": "2025-02-01T00:00:00Z", "csat_score": 3},
+]
+
+
+def totals(count, csat, ces, hallucinations=0, legal=0, positive=0, neutral=0, negative=0):
+    return {
+        "avgCSAT": csat, "avgCES": ces, "count": count,
+        "hallucination_count": hallucinations, "legal_risk_score": legal,
+        "positive_sentiment": positive, "neutral_sentiment": neutral, "negative_sentiment": negative,
+    }
+
+
+@pytest.fixture(autouse=True)
+def aggregates(monkeypatch):
+    """Fresh aggregate state (the server preloads data/ at import) with RECORDS folded in"""
+    monkeypatch.setattr(server, "AGG_STATE", {group_by: {} for group_by in server.AGG_GROUPS})
+    monkeypatch.setattr(server, "_AGG_VIEWS", {})
+    for record in RECORDS:
+        server.aggregate_intel_result(record)
+
+
+def test_day():
+    assert server.load_aggregated_intel_results("day") == {
+        "2025-01-06": totals(2, 4.0, 2.0, hallucinations=1, legal=5, positive=1, neutral=1),
+        "2025-01-08": totals(1, 5.0, 4.0, negative=1),
+        "2025-02-01": totals(1, 3.0, None),
+    }
+
+
+def test_week():
+    assert server.load_aggregated_intel_results("week") == {
+        "2025-W01": totals(3, 4.5, 3.0, hallucinations=1, legal=5, positive=1, neutral=1, negative=1),
+        "2025-W04": totals(1, 3.0, None),
+    }
+
+
+def test_month():
+    assert server.load_aggregated_intel_results("month") == {
+        "2025-01": totals(3, 4.5, 3.0, hallucinations=1, legal=5, positive=1, neutral=1, negative=1),
+        "2025-02": totals(1, 3.0, None),
+    }
+
+
+def test_year():
+    assert server.load_aggregated_intel_results("year") == {
+        "2025": totals(4, 4.0, 3.0, hallucinations=1, legal=5, positive=1, neutral=1, negative=1),
+    }
+
+
+def test_unknown_group_falls_back_to_day():
+    assert server.load_aggregated_intel_results("quarter") == server.load_aggregated_intel_results("day")
+
+
+def test_new_result_invalidates_cached_view():
+    assert server.load_aggregated_intel_results("year")["2025"]["count"] == 4
+    server.aggregate_intel_result({"ts": "2025-03-01T12:00:00Z", "csat_score": 5})
+    assert server.load_aggregated_intel_results("year")["2025"]["count"] == 5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for the streaming #route_to tag handling in TwilioWebSocketHandler
+(_buffer_token / _finish_route / _flush_tokens)
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "Signal SP Session"))
+server = pytest.importorskip("server")
+
+
+def make_handler():
+    """Handler with only the streaming state set up; say frames are recorded instead of sent"""
+    handler = server.TwilioWebSocketHandler.__new__(server.TwilioWebSocketHandler)
+    handler.config = server.ConversationConfig()
+    handler._interruptible = True
+    handler._pending_tokens = []
+    handler._reset_pending()
+    handler._spoken_parts = []
+    handler.frames = []
+
+    async def send_relay_say(text, *, last, interruptible=True):
+        handler.frames.append((text, last))
+
+    handler.send_relay_say = send_relay_say
+    return handler
+
+
+def stream(tokens):
+    """Feed tokens the way process_complete_input does; returns (frames, requested agent, spoken text)"""
+    handler = make_handler()
+
+    async def run():
+        agent = None
+        for token in tokens:
+            agent = await handler._buffer_token(token)
+            if agent:
+                break
+        if agent is None:
+            agent = handler._finish_route()
+        await handler._flush_tokens(last=True)
+        return agent
+
+    agent = asyncio.run(run())
+    return handler.frames, agent, ''.join(handler._spoken_parts)
+
+
+def test_plain_reply_ends_on_last_real_chunk():
+    frames, agent, _ = stream(["Hello", " there.", " How", " are you?"])
+    assert frames == [("Hello there.", False), (" How are you?", True)]
+    assert agent is None
+
+
+def test_tag_split_across_tokens():
+    frames, agent, spoken = stream(["Let me transfer you. #", "route", "_to:", "Sunny", "\n"])
+    assert agent == "Sunny"
+    assert frames == [("Let me transfer you.", True)]
+    assert "#" not in spoken
+
+
+def test_text_before_tag_in_same_token_is_flushed_at_sentence_end():
+    handler = make_handler()
+
+    async def run():
+        assert await handler._buffer_token("Done. #route_to:") is None
+        # "Done." has a sentence end, so it is closed into a chunk before the tag completes
+        assert handler._held_chunk == "Done. "
+        return await handler._buffer_token("Sunny\n")
+
+    assert asyncio.run(run()) == "Sunny"
+
+
+def test_literal_hash_is_spoken():
+    frames, agent, spoken = stream(["Press #", "1 to", " continue."])
+    assert agent is None
+    assert spoken == "Press #1 to continue."
+    assert frames[-1][1] is True
+
+
+def test_tag_in_middle_of_reply():
+    frames, agent, spoken = stream(["Sure. #route_to:Io", " and then more text."])
+    assert agent == "Io"
+    assert spoken == "Sure."
+    assert frames == [("Sure.", True)]
+
+
+def test_reply_that_is_only_a_tag():
+    frames, agent, spoken = stream(["#route_to:", "Max"])
+    assert agent == "Max"
+    assert frames == []
+    assert spoken == ""
+
+
+def test_trailing_hash_is_released():
+    frames, agent, spoken = stream(["It costs 5", " #"])
+    assert agent is None
+    assert frames == [("It costs 5 #", True)]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])